@@ -0,0 +1,10 @@
+import importlib
+
+__all__ = ["girvan_newman", "louvains", "spectral_clustering"]
+
+
+def __getattr__(name):
+    # Submodules are imported on first access, so `import cdet` stays cheap
+    if name in __all__:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,409 @@
+"""
+Batch community detection over many small graphs.
+
+run_batch takes any iterable of graphs (nx.Graph, scipy sparse matrices or
+CSR tuples) and yields one record per graph as results come in:
+
+    for record in run_batch(ego_networks, method="louvain", n_jobs=-1, timeout=5):
+        if record["status"] == "ok":
+            partition, modularity = record["partition"], record["modularity"]
+
+Graphs are sent to the workers in chunks, and only max_pending chunks are
+in flight or waiting to be yielded at a time, so a generator of graphs is
+read as the results are consumed rather than all at once. Within a chunk,
+graphs of at most pack_nodes nodes are packed together: Louvain runs once
+on their block diagonal union, and spectral clustering solves all their
+eigenproblems in a single batched call.
+"""
+
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from multiprocessing import Pool
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+from cdet.louvains import (_csr_queue_local_moving, _csr_to_edge_arrays, _edge_arrays_to_csr, csr_community_aggregation,
+    csr_leiden_method, csr_louvains_method)
+from cdet.partition import Partition
+
+
+METHODS = ["louvain", "leiden", "spectral"]
+
+# Seconds between checks for dead workers while waiting for results
+POLL_INTERVAL = 0.5
+# Seconds to wait for the result of a chunk its worker finished before it died
+RESULT_GRACE = 30
+
+
+def run_batch(graphs, method="louvain", n_jobs=None, chunk_size=16, max_pending=None, ordered=True, timeout=None,
+        pack_nodes=64, **kwargs):
+    """
+    Runs community detection on every graph of an iterable.
+
+    Parameters
+    ----------
+    graphs: Iterable of nx.Graph, scipy sparse matrix or (indptr, indices, weights)
+        Undirected graphs, CSR tuples as in cdet.edgelist
+    method: str
+        "louvain" (csr_louvains_method), "leiden" (csr_leiden_method) or
+        "spectral" (spectral_clustering, needs k in kwargs)
+    n_jobs: int
+        Worker processes, None or 1 runs in this process and -1 uses all
+        the cores
+    chunk_size: int
+        Graphs sent to a worker at a time
+    max_pending: int
+        Chunks submitted or finished but not yet yielded, by default
+        2 * n_jobs
+    ordered: bool
+        Yield the records in the order of graphs, otherwise chunk by chunk
+        as they complete
+    timeout: float
+        Seconds allowed per graph, None for no limit. The limit is raised
+        as an alarm signal in the worker, so it cannot cut short a single
+        long call into compiled code, e.g. one eigsh solve
+    pack_nodes: int
+        Graphs of at most this many nodes are packed together, 0 never
+        packs. Leiden, and Louvain with active_set=False, are never packed
+    kwargs:
+        Passed to the method, e.g. resolution, or k and laplacian_type.
+        Louvain runs with active_set=True unless it is given
+
+    Returns
+    -------
+    records: Iterator[Dict]
+        One record per graph, with the "index" of the graph in graphs and
+        the "status", which is "ok", "timeout" or "failed". "ok" records
+        have the "partition" as a cdet.partition.Partition labeled with the
+        nodes of the graph, and "modularity" for Louvain and Leiden.
+        "failed" records have the "error", also when the worker process
+        running the graph died. The arguments are checked on the call,
+        the graphs only as the records are consumed
+    """
+
+    if method not in METHODS:
+        raise ValueError("Method can be one of {}.".format(METHODS))
+    if method == "spectral" and "k" not in kwargs:
+        raise ValueError("Spectral clustering needs the no. of clusters k.")
+    if chunk_size < 1 or max_pending is not None and max_pending < 1:
+        raise ValueError("chunk_size and max_pending must be at least 1.")
+    if method == "louvain":
+        # Sweeps over a packed union continue until every graph has
+        # converged, the queue only revisits the graphs still moving
+        kwargs.setdefault("active_set", True)
+
+    return _run_batch(graphs, (method, kwargs, timeout, pack_nodes), n_jobs, chunk_size, max_pending, ordered)
+
+
+def _run_batch(graphs, config, n_jobs, chunk_size, max_pending, ordered):
+
+    items = enumerate(graphs)
+    chunks = iter(lambda: list(islice(items, chunk_size)), [])
+
+    if n_jobs is None or n_jobs == 1:
+        for chunk in chunks:
+            yield from _run_chunk(chunk, *config)
+        return
+
+    if n_jobs < 0:
+        n_jobs = os.cpu_count()
+    if max_pending is None:
+        max_pending = 2 * n_jobs
+
+    done = queue.Queue()
+    # Workers report (chunk, pid, False) as they start a chunk and
+    # (chunk, pid, True) once its records are ready. Writes to a
+    # SimpleQueue are not buffered, so the reports survive a crash
+    started = multiprocessing.SimpleQueue()
+    finished = {}
+    # Indices of the graphs of every chunk without records yet
+    pending = {}
+    running = {}
+    # Chunks whose worker finished them and died, by when that was noticed
+    orphaned = {}
+    submitted = yielded = 0
+
+    with Pool(n_jobs, initializer=_init_batch_worker, initargs=(started,) + config) as pool:
+        while 1:
+            # Back-pressure: read more graphs only while there is room
+            while submitted - yielded < max_pending:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                indices = pending[submitted] = [index for index, _ in chunk]
+                pool.apply_async(_batch_worker, (submitted, chunk),
+                    callback=lambda records, i=submitted: done.put((i, records)),
+                    error_callback=lambda e, i=submitted, indices=indices: done.put((i, [_failed(index, e) for index in indices])))
+                submitted += 1
+
+            if yielded == submitted:
+                break
+
+            try:
+                i, records = done.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                # A worker that dies takes its chunk with it and no callback
+                # ever fires. The pool replaces the worker, so only that
+                # chunk fails. The records of a chunk the worker finished
+                # before dying can still be on their way, so those get
+                # RESULT_GRACE seconds to arrive
+                while not started.empty():
+                    i, pid, ready = started.get()
+                    running[i] = (pid, ready)
+                alive = {process.pid for process in multiprocessing.active_children()}
+                now = time.monotonic()
+                for i, (pid, ready) in running.items():
+                    if i not in pending or pid in alive:
+                        continue
+                    if ready and now - orphaned.setdefault(i, now) < RESULT_GRACE:
+                        continue
+                    error = RuntimeError("Worker process {} died.".format(pid))
+                    done.put((i, [_failed(index, error) for index in pending[i]]))
+                continue
+
+            # Only the first records of a chunk count, a worker can die
+            # right after sending them
+            if pending.pop(i, None) is None:
+                continue
+            running.pop(i, None)
+            orphaned.pop(i, None)
+            if not ordered:
+                yielded += 1
+                yield from records
+                continue
+
+            finished[i] = records
+            while yielded in finished:
+                records = finished.pop(yielded)
+                yielded += 1
+                yield from records
+
+
+def _init_batch_worker(started, method, kwargs, timeout, pack_nodes):
+    global _batch_started, _batch_config
+    _batch_started = started
+    _batch_config = (method, kwargs, timeout, pack_nodes)
+
+
+def _batch_worker(i, chunk):
+    _batch_started.put((i, os.getpid(), False))
+    records = _run_chunk(chunk, *_batch_config)
+    _batch_started.put((i, os.getpid(), True))
+    return records
+
+
+def _run_chunk(chunk, method, kwargs, timeout, pack_nodes):
+    """
+    Records of a chunk of (index, graph) pairs, in index order.
+    """
+
+    records = {}
+    graphs = []
+    for index, G in chunk:
+        try:
+            csr, node_ids = _as_csr(G)
+        except Exception as e:
+            records[index] = _failed(index, e)
+            continue
+        graphs.append((index, csr, node_ids))
+
+    packed = [graph for graph in graphs if _packable(graph[1], method, kwargs, pack_nodes)]
+    if len(packed) > 1:
+        try:
+            with _time_limit(None if timeout is None else timeout * len(packed)):
+                if method == "spectral":
+                    results = _packed_spectral([csr for _, csr, _ in packed], **kwargs)
+                else:
+                    results = _packed_louvain([csr for _, csr, _ in packed], **kwargs)
+            for (index, _, node_ids), result in zip(packed, results):
+                records[index] = _record(index, result, node_ids)
+        except Exception:
+            # Retry one by one, so a single bad or slow graph only fails itself
+            pass
+
+    for index, csr, node_ids in graphs:
+        if index in records:
+            continue
+        try:
+            with _time_limit(timeout):
+                result = _run_single(method, csr, kwargs)
+            records[index] = _record(index, result, node_ids)
+        except TimeoutError:
+            records[index] = {"index": index, "status": "timeout"}
+        except Exception as e:
+            records[index] = _failed(index, e)
+
+    return [records[index] for index in sorted(records)]
+
+
+def _packable(csr, method, kwargs, pack_nodes):
+
+    n = len(csr[0]) - 1
+    if method == "leiden" or n > pack_nodes:
+        return False
+    if method == "spectral":
+        return n >= kwargs["k"]
+    if not kwargs.get("active_set", True):
+        return False
+    # Graphs without edges cannot be rescaled, Louvain returns them as they are
+    return csr[2].sum() > 0
+
+
+def _run_single(method, csr, kwargs):
+
+    if method == "louvain":
+        return csr_louvains_method(*csr, as_partition=True, **kwargs)
+    if method == "leiden":
+        return csr_leiden_method(*csr, as_partition=True, **kwargs)
+
+    from cdet.spectral_clustering import spectral_clustering
+
+    kwargs = dict(kwargs)
+    k = kwargs.pop("k")
+    return spectral_clustering(csr, k, None, None, visualize=False, as_partition=True, **kwargs)
+
+
+def _packed_louvain(graphs, resolution=1, seed=None, **kwargs):
+    """
+    (partition, modularity) of every graph from one Louvain run on their
+    block diagonal union. Other csr_louvains_method options are ignored.
+
+    Levels are those of csr_louvains_method with active_set=True, except
+    that every node is given the total weight m_b of its own graph. The
+    modularity gains within graph b are then those of the graph alone, and
+    the moves are the same as on each graph separately, unless a seed
+    shuffles the nodes of all graphs together.
+    """
+
+    sizes = np.array([len(indptr) - 1 for indptr, _, _ in graphs])
+    node_offsets = np.concatenate(([0], np.cumsum(sizes)))
+    entry_offsets = np.concatenate(([0], np.cumsum([len(indices) for _, indices, _ in graphs])))
+    m = np.array([weights.sum() / 2 for _, _, weights in graphs])
+
+    indptr = np.concatenate([indptr[:-1] + offset for (indptr, _, _), offset in zip(graphs, entry_offsets)] + [entry_offsets[-1:]])
+    indices = np.concatenate([indices + offset for (_, indices, _), offset in zip(graphs, node_offsets)])
+    weights = np.concatenate([weights for _, _, weights in graphs])
+    entry_graph = np.repeat(np.arange(len(graphs)), np.diff(entry_offsets))
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+    k_i = np.bincount(rows, weights=weights, minlength=len(indptr) - 1)
+    node_m = np.repeat(m, sizes)
+    membership = np.arange(len(k_i))
+    rng = np.random.default_rng(seed) if seed is not None else None
+    level = (indptr, indices, weights)
+    src, dst, edge_weights = _csr_to_edge_arrays(indptr, indices, weights)
+
+    while 1:
+        queue = rng.permutation(len(k_i)) if rng is not None else np.arange(len(k_i))
+        communities = _csr_queue_local_moving(*level, k_i, node_m, np.arange(len(k_i)), queue, resolution=resolution)
+
+        src, dst, edge_weights, communities = csr_community_aggregation(src, dst, edge_weights, communities)
+        membership = communities[membership]
+        k_i = np.bincount(communities, weights=k_i)
+        coarse_m = np.empty(len(k_i))
+        coarse_m[communities] = node_m
+        node_m = coarse_m
+
+        if len(k_i) == len(communities):
+            break
+        level = _edge_arrays_to_csr(len(k_i), src, dst, edge_weights)
+
+    # Modularity of every graph with its own weights
+    internal = membership[rows] == membership[indices]
+    sigma_in = np.bincount(entry_graph[internal], weights=weights[internal], minlength=len(graphs))
+    sigma_tot = np.bincount(membership, weights=np.bincount(rows, weights=weights, minlength=len(indptr) - 1))
+    community_graph = np.repeat(np.arange(len(graphs)), sizes)[np.unique(membership, return_index=True)[1]]
+    sum_tot_sq = np.bincount(community_graph, weights=sigma_tot ** 2, minlength=len(graphs))
+    modularity = (sigma_in - resolution * sum_tot_sq / (m*2)) / (m*2)
+
+    results = []
+    for b in range(len(graphs)):
+        # Communities never span graphs and are numbered graph by graph
+        labels = membership[node_offsets[b]:node_offsets[b + 1]]
+        results.append((Partition(labels - labels.min()), float(modularity[b])))
+    return results
+
+
+def _packed_spectral(graphs, k, laplacian_type="unnormalized", clustering="kmeans", n_init=None, n_threads=None,
+        batch_size=4096, **kwargs):
+    """
+    Partition of every graph, from one batch_spectral_embedding call. The
+    eigensolver options of spectral_clustering do not apply and are ignored.
+    """
+
+    from cdet.spectral_clustering import batch_spectral_embedding, cluster_embedding, labels_partition
+
+    return [labels_partition(G, cluster_embedding(U, k, clustering=clustering, n_init=n_init, n_threads=n_threads, batch_size=batch_size))
+        for G, U in zip(graphs, batch_spectral_embedding(graphs, k, laplacian_type=laplacian_type))]
+
+
+def _as_csr(G):
+    """
+    Symmetric CSR arrays and node ids (None for 0..n-1) of a graph.
+    """
+
+    if isinstance(G, tuple):
+        indptr, indices, weights = G
+        return (np.asarray(indptr), np.asarray(indices), np.asarray(weights, dtype=np.float64)), None
+
+    if isinstance(G, nx.Graph):
+        if G.is_directed():
+            raise ValueError("Graphs must be undirected.")
+        node_ids = list(G)
+        # Straight from the edge list, scipy's setup costs more than the
+        # conversion itself on small graphs
+        index = {node: i for i, node in enumerate(node_ids)}
+        edges = np.array([(index[u], index[v], w) for u, v, w in G.edges(data="weight", default=1)], dtype=np.float64).reshape(-1, 3)
+        src, dst = edges[:, 0].astype(np.int64), edges[:, 1].astype(np.int64)
+        return _edge_arrays_to_csr(len(node_ids), src, dst, edges[:, 2]), node_ids
+
+    W = sp.csr_matrix(G, dtype=np.float64)
+    # The CSR arrays store twice the self-loop weight on the diagonal
+    W = sp.csr_matrix(W + sp.diags(W.diagonal()))
+    return (W.indptr.astype(np.int64), W.indices.astype(np.int64), W.data), None
+
+
+def _record(index, result, node_ids):
+
+    partition, modularity = result if isinstance(result, tuple) else (result, None)
+    if node_ids is not None:
+        partition = partition.with_node_ids(node_ids)
+    record = {"index": index, "status": "ok", "partition": partition}
+    if modularity is not None:
+        record["modularity"] = modularity
+    return record
+
+
+def _failed(index, error):
+    return {"index": index, "status": "failed", "error": repr(error)}
+
+
+@contextmanager
+def _time_limit(seconds):
+    """
+    Raises TimeoutError in the block after seconds, using SIGALRM where the
+    platform and thread allow it. Otherwise there is no limit.
+    """
+
+    if seconds is None or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def alarm(signum, frame):
+        raise TimeoutError("Graph took longer than {} s.".format(seconds))
+
+    previous = signal.signal(signal.SIGALRM, alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
@@ -0,0 +1,322 @@
+"""
+Benchmark suite for the community detection algorithms in cdet.
+
+Sweeps graph size and average degree over seeded planted partition, LFR
+and stochastic block model graphs, runs each algorithm in a fresh process
+and writes one JSON record per run (wall time, peak RSS, modularity,
+NMI/ARI against the ground truth) to a JSON lines file.
+
+Usage:
+    python -m cdet.benchmark --sizes 250 1000 4000 --degrees 8 16 --output bench.jsonl
+    python -m cdet.benchmark ... --compare old_bench.jsonl
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+
+import networkx as nx
+import numpy as np
+
+
+ALGORITHMS = ["louvain", "louvain_csr", "leiden", "girvan_newman", "spectral"]
+GENERATORS = ["planted_partition", "lfr", "sbm"]
+
+
+def generate_graph(generator, n, avg_degree, mixing=0.1, community_size=100, seed=0):
+    """
+    Creates a seeded benchmark graph with known communities.
+
+    Parameters
+    ----------
+    generator: str
+        "planted_partition", "lfr" or "sbm"
+    n: int
+        No. of nodes
+    avg_degree: float
+        Expected average degree
+    mixing: float
+        Expected fraction of the edges of a node that leave its community
+    community_size: int
+        Average community size ("planted_partition" and "sbm")
+    seed: int
+        Random seed
+
+    Returns
+    -------
+    G: nx.Graph
+        Largest connected component, with nodes relabeled 0..len(G)-1
+    truth: 1D np.array
+        Ground truth community of every node
+    """
+
+    num_blocks = max(2, n // community_size)
+
+    if generator == "planted_partition":
+        size = n // num_blocks
+        p_in = min(1, avg_degree * (1 - mixing) / (size - 1))
+        p_out = avg_degree * mixing / (n - size)
+        G = nx.planted_partition_graph(num_blocks, size, p_in, p_out, seed=seed)
+        partition = G.graph["partition"]
+    elif generator == "sbm":
+        rng = np.random.default_rng(seed)
+        weights = rng.uniform(0.5, 1.5, num_blocks)
+        sizes = np.maximum(2, np.round(weights / weights.sum() * n)).astype(int).tolist()
+        probs = [[0.0] * num_blocks for _ in range(num_blocks)]
+        for i in range(num_blocks):
+            for j in range(num_blocks):
+                if i == j:
+                    probs[i][j] = min(1, avg_degree * (1 - mixing) / (sizes[i] - 1))
+                else:
+                    # p must be symmetric, so every block pair shares the mean out-probability
+                    probs[i][j] = avg_degree * mixing / (sum(sizes) - sum(sizes) / num_blocks)
+        G = nx.stochastic_block_model(sizes, probs, seed=seed)
+        partition = G.graph["partition"]
+    elif generator == "lfr":
+        min_community = max(10, community_size // 5)
+        max_community = max(2 * min_community, min(n // 2, 4 * community_size))
+        G = nx.LFR_benchmark_graph(n, 3, 1.5, mixing, average_degree=avg_degree, max_degree=int(max(avg_degree + 1, min(n // 4, 5 * avg_degree))),
+            min_community=min_community, max_community=max_community, seed=seed)
+        partition = list({frozenset(G.nodes[v]["community"]) for v in G})
+        G = nx.Graph(G)
+    else:
+        raise ValueError("Generator can be 'planted_partition', 'lfr' or 'sbm'.")
+
+    G.remove_edges_from(nx.selfloop_edges(G))
+    truth = np.empty(len(G), dtype=np.int64)
+    for c, nodes in enumerate(partition):
+        truth[list(nodes)] = c
+
+    # louvains_method has no entry for isolated nodes, so only the largest component is kept
+    nodes = sorted(max(nx.connected_components(G), key=len))
+    if len(nodes) < len(G):
+        G = nx.convert_node_labels_to_integers(G.subgraph(nodes), ordering="sorted")
+        truth = np.unique(truth[nodes], return_inverse=True)[1]
+
+    return G, truth
+
+
+def run_algorithm(algorithm, G, num_communities):
+    """
+    Runs one algorithm on G and returns the community label of every node.
+    """
+
+    n = len(G)
+    labels = np.empty(n, dtype=np.int64)
+
+    if algorithm in ("louvain", "louvain_csr", "leiden"):
+        from cdet.louvains import add_weight_to_edge, calc_wts, get_edges_of_node, louvains_method, edges_to_csr, csr_louvains_method, csr_leiden_method
+
+        nodes = list(range(n))
+        edges = add_weight_to_edge(list(G.edges))
+        if algorithm == "louvain":
+            m, k_i = calc_wts(nodes, edges)
+            partition, _ = louvains_method(nodes, edges, m, k_i, [0 for n in nodes], get_edges_of_node(edges), list(nodes), [])
+        elif algorithm == "louvain_csr":
+            partition, _ = csr_louvains_method(*edges_to_csr(nodes, edges))
+        else:
+            partition, _ = csr_leiden_method(*edges_to_csr(nodes, edges))
+        for c, part in enumerate(partition):
+            labels[part] = c
+    elif algorithm == "girvan_newman":
+        from cdet.girvan_newman import girvan_newman
+
+        communities, _ = girvan_newman(G.copy(), num_communities)
+        for c, part in enumerate(communities):
+            labels[list(part)] = c
+    elif algorithm == "spectral":
+        from cdet.spectral_clustering import spectral_clustering
+
+        labels_dict = spectral_clustering(G, num_communities, None, None, visualize=False, laplacian_type="symmetric")
+        for c, part in labels_dict.items():
+            labels[part] = c
+    else:
+        raise ValueError("Algorithm can be one of {}.".format(ALGORITHMS))
+
+    return labels
+
+
+def _run_case(case):
+
+    from networkx.algorithms.community import modularity
+    from sklearn.metrics import adjusted_rand_score, normalized_mutual_info_score
+
+    record = dict(case)
+    try:
+        G, truth = generate_graph(case["generator"], case["n"], case["avg_degree"],
+            mixing=case["mixing"], community_size=case["community_size"], seed=case["seed"])
+    except Exception as e:
+        record.update(status="generator_failed", error=repr(e))
+        return record
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    labels = run_algorithm(case["algorithm"], G, int(truth.max()) + 1)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    communities = [set(np.flatnonzero(labels == c).tolist()) for c in np.unique(labels)]
+    record.update(
+        status="ok",
+        num_edges=G.number_of_edges(),
+        time_s=elapsed,
+        # ru_maxrss is in kilobytes on Linux
+        peak_rss_kb=rss_after,
+        peak_rss_delta_kb=rss_after - rss_before,
+        modularity=modularity(G, communities, weight=None),
+        nmi=normalized_mutual_info_score(truth, labels),
+        ari=adjusted_rand_score(truth, labels),
+        num_communities=len(communities),
+        true_communities=int(truth.max()) + 1,
+    )
+    return record
+
+
+def run_benchmarks(algorithms, generators, sizes, degrees, seeds=(0,), mixing=0.1, community_size=100,
+        gn_max_nodes=300, timeout=600, output=None):
+    """
+    Runs every combination of algorithm, generator, size, degree and seed,
+    each in its own process so peak RSS is per run.
+
+    Parameters
+    ----------
+    algorithms: List[str]
+        Subset of ALGORITHMS
+    generators: List[str]
+        Subset of GENERATORS
+    sizes: List[int]
+        Node counts
+    degrees: List[float]
+        Average degrees
+    seeds: List[int]
+        Graph seeds
+    mixing: float
+        Fraction of inter-community edges
+    community_size: int
+        Average community size
+    gn_max_nodes: int
+        Girvan-Newman is skipped on graphs larger than this
+    timeout: float
+        Seconds before a run is killed and recorded as "timeout"
+    output: str
+        JSON lines file the records are written to as they finish
+
+    Returns
+    -------
+    records: List[Dict]
+        One record per run
+    """
+
+    context = multiprocessing.get_context("spawn")
+    records = []
+    out = open(output, "w") if output else None
+
+    try:
+        for generator in generators:
+            for n in sizes:
+                for avg_degree in degrees:
+                    for seed in seeds:
+                        for algorithm in algorithms:
+                            case = dict(algorithm=algorithm, generator=generator, n=n, avg_degree=avg_degree,
+                                mixing=mixing, community_size=community_size, seed=seed)
+                            if algorithm == "girvan_newman" and n > gn_max_nodes:
+                                continue
+
+                            pool = context.Pool(1, maxtasksperchild=1)
+                            try:
+                                record = pool.apply_async(_run_case, (case,)).get(timeout)
+                            except multiprocessing.TimeoutError:
+                                record = dict(case, status="timeout")
+                            except Exception as e:
+                                record = dict(case, status="failed", error=repr(e))
+                            finally:
+                                pool.terminate()
+                                pool.join()
+
+                            records.append(record)
+                            if out:
+                                out.write(json.dumps(record, sort_keys=True) + "\n")
+                                out.flush()
+                            print(format_record(record), file=sys.stderr)
+    finally:
+        if out:
+            out.close()
+
+    return records
+
+
+def format_record(record):
+
+    name = "{algorithm:>13} {generator:>17} n={n:<7} deg={avg_degree:<5} seed={seed}".format(**record)
+    if record["status"] != "ok":
+        return "{} {}".format(name, record["status"])
+    return "{} {time_s:9.3f}s {peak_rss_kb:>9}kB Q={modularity:.4f} NMI={nmi:.3f} ARI={ari:.3f}".format(name, **record)
+
+
+def compare_records(old, new):
+    """
+    Pairs up runs of two benchmark files and reports the time, memory and
+    quality changes of every run present in both.
+
+    Returns
+    -------
+    rows: List[Dict]
+        One row per matched run
+    """
+
+    key = lambda r: (r["algorithm"], r["generator"], r["n"], r["avg_degree"], r["seed"])
+    old = {key(r): r for r in old if r.get("status") == "ok"}
+    rows = []
+    for r in new:
+        if r.get("status") == "ok" and key(r) in old:
+            o = old[key(r)]
+            rows.append(dict(zip(("algorithm", "generator", "n", "avg_degree", "seed"), key(r)),
+                time_ratio=r["time_s"] / o["time_s"] if o["time_s"] else float("inf"),
+                rss_ratio=r["peak_rss_kb"] / o["peak_rss_kb"] if o["peak_rss_kb"] else float("inf"),
+                modularity_change=r["modularity"] - o["modularity"],
+                nmi_change=r["nmi"] - o["nmi"]))
+    return rows
+
+
+def load_records(path):
+
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithms", nargs="+", default=ALGORITHMS, choices=ALGORITHMS)
+    parser.add_argument("--generators", nargs="+", default=GENERATORS, choices=GENERATORS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[250, 1000, 4000])
+    parser.add_argument("--degrees", nargs="+", type=float, default=[8, 16])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--mixing", type=float, default=0.1)
+    parser.add_argument("--community-size", type=int, default=100)
+    parser.add_argument("--gn-max-nodes", type=int, default=300)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", default="bench_output.jsonl")
+    parser.add_argument("--compare", help="Earlier JSON lines file to diff the results against")
+    args = parser.parse_args()
+
+    print("python {} networkx {} numpy {} on {}".format(platform.python_version(), nx.__version__,
+        np.__version__, platform.platform()), file=sys.stderr)
+
+    records = run_benchmarks(args.algorithms, args.generators, args.sizes, args.degrees, seeds=args.seeds,
+        mixing=args.mixing, community_size=args.community_size, gn_max_nodes=args.gn_max_nodes,
+        timeout=args.timeout, output=args.output)
+
+    if args.compare:
+        for row in compare_records(load_records(args.compare), records):
+            print("{algorithm:>13} {generator:>17} n={n:<7} deg={avg_degree:<5} seed={seed} "
+                "time x{time_ratio:.2f} rss x{rss_ratio:.2f} dQ={modularity_change:+.4f} "
+                "dNMI={nmi_change:+.3f}".format(**row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Streaming edge-list ingestion.
+
+Reads large edge lists in chunks straight into the symmetric CSR arrays
+(indptr, indices, weights) used by csr_louvains_method, without building a
+networkx graph or a Python list of edges. Arbitrary node ids are remapped
+to dense integers 0..n-1 and returned alongside the arrays:
+
+    (indptr, indices, weights), node_ids = read_edgelist("edges.tsv", nodetype=int)
+    partition, modularity = csr_louvains_method(indptr, indices, weights)
+    communities = [node_ids[part] for part in partition]
+
+The same arrays can be passed as G to spectral_clustering and as graph to
+girvan_newman.
+
+save_graph writes the arrays, the degree vector and the node id map to a
+directory of .npy files that open_graph memory maps, so repeated runs and
+every worker of a pool share one page-cached copy instead of re-parsing:
+
+    python -m cdet.edgelist edges.tsv graph_dir --nodetype int
+    (indptr, indices, weights), degrees, node_ids = open_graph("graph_dir")
+"""
+
+import argparse
+import json
+import os
+from itertools import islice
+
+import networkx as nx
+import numpy as np
+
+from cdet.louvains import _edge_arrays_to_csr
+
+
+FORMATS = ["text", "csv", "npy", "bin"]
+STORE_VERSION = 1
+
+
+class NodeMap:
+    """
+    Assigns dense integer ids to arbitrary node ids as they are seen.
+    Each chunk costs one np.unique plus a dict lookup per distinct id.
+    """
+
+    def __init__(self):
+        self.index = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def map(self, ids):
+        unique, inverse = np.unique(ids, return_inverse=True)
+        index = self.index
+        codes = np.fromiter((index.setdefault(u, len(index)) for u in unique.tolist()), dtype=np.int64, count=len(unique))
+        return codes[inverse.ravel()]
+
+    def node_ids(self):
+        node_ids = list(self.index)
+        try:
+            return np.array(node_ids)
+        except ValueError:
+            return np.array(node_ids, dtype=object)
+
+
+def iter_edge_chunks(path, fmt=None, delimiter=None, comments="#", nodetype=None, weighted=False,
+        header=False, dtype=np.int64, chunk_size=1 << 20):
+    """
+    Yields (src, dst, weights) array chunks of at most chunk_size edges.
+
+    Parameters
+    ----------
+    path: str
+        Edge list file
+    fmt: str
+        "text" (whitespace or delimiter separated), "csv", "npy" (an (E, 2)
+        or (E, 3) array, memory mapped) or "bin" (raw rows of 2 or 3 values
+        of dtype). None infers it from the file extension
+    delimiter: str
+        Column separator for "text", None splits on whitespace
+    comments: str
+        Lines starting with this are skipped ("text" and "csv")
+    nodetype: callable
+        Converts the node columns of "text" and "csv", e.g. int. None keeps
+        them as strings
+    weighted: bool
+        Read a third column as edge weights, otherwise every weight is 1
+    header: bool
+        Skip the first line ("text" and "csv")
+    dtype: np.dtype
+        Value type of "bin" files
+    chunk_size: int
+        Edges per chunk
+    """
+
+    if fmt is None:
+        fmt = {".npy": "npy", ".bin": "bin", ".csv": "csv"}.get(path[path.rfind("."):].lower() if "." in path else "", "text")
+
+    if fmt in ("npy", "bin"):
+        if fmt == "npy":
+            data = np.load(path, mmap_mode="r")
+        else:
+            data = np.memmap(path, dtype=dtype, mode="r").reshape(-1, 3 if weighted else 2)
+        if data.ndim != 2 or data.shape[1] < (3 if weighted else 2):
+            raise ValueError("Expected an (E, 2) array, or (E, 3) with weighted=True, got shape {}.".format(data.shape))
+        for start in range(0, len(data), chunk_size):
+            chunk = np.asarray(data[start:start + chunk_size])
+            weights = chunk[:, 2].astype(np.float64) if weighted else np.ones(len(chunk))
+            yield chunk[:, 0], chunk[:, 1], weights
+    elif fmt in ("text", "csv"):
+        if fmt == "csv" and delimiter is None:
+            delimiter = ","
+        usecols = (0, 1, 2) if weighted else (0, 1)
+        with open(path) as f:
+            if header:
+                next(f, None)
+            while 1:
+                lines = list(islice(f, chunk_size))
+                if not lines:
+                    break
+                lines = [line for line in lines if line.strip() and not line.startswith(comments)]
+                if not lines:
+                    continue
+                chunk = np.loadtxt(lines, dtype=str, delimiter=delimiter, usecols=usecols, ndmin=2)
+                src, dst = chunk[:, 0], chunk[:, 1]
+                if nodetype is not None:
+                    src, dst = _convert(src, nodetype), _convert(dst, nodetype)
+                weights = chunk[:, 2].astype(np.float64) if weighted else np.ones(len(chunk))
+                yield src, dst, weights
+    else:
+        raise ValueError("Format can be one of {}.".format(FORMATS))
+
+
+def _convert(ids, nodetype):
+
+    if nodetype in (int, float):
+        return ids.astype(np.int64 if nodetype is int else np.float64)
+    return np.array([nodetype(i) for i in ids.tolist()])
+
+
+def read_edgelist(path, fmt=None, delimiter=None, comments="#", nodetype=None, weighted=False,
+        header=False, dtype=np.int64, chunk_size=1 << 20):
+    """
+    Streams an undirected edge list into symmetric CSR arrays. Takes the
+    same arguments as iter_edge_chunks.
+
+    Every edge appears in the rows of both endpoints and a self-loop of
+    weight w adds 2 * w to the diagonal, as in edges_to_csr. Repeated
+    edges are kept as parallel entries, so their weights add up.
+
+    Returns
+    -------
+    csr: (indptr, indices, weights)
+        indptr and indices as np.int64, weights as np.float64
+    node_ids: 1D np.array
+        Original id of every dense node. Ids are numbered chunk by chunk
+        as they are first seen, in sorted order within a chunk
+    """
+
+    node_map = NodeMap()
+    src, dst, weights = [], [], []
+    for s, d, w in iter_edge_chunks(path, fmt=fmt, delimiter=delimiter, comments=comments, nodetype=nodetype,
+            weighted=weighted, header=header, dtype=dtype, chunk_size=chunk_size):
+        codes = node_map.map(np.concatenate((s, d)))
+        src.append(codes[:len(s)])
+        dst.append(codes[len(s):])
+        weights.append(w)
+
+    if not src:
+        return (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)), np.zeros(0)
+
+    csr = _edge_arrays_to_csr(len(node_map), np.concatenate(src), np.concatenate(dst), np.concatenate(weights))
+    return csr, node_map.node_ids()
+
+
+def csr_to_graph(indptr, indices, weights):
+    """
+    Builds an nx.Graph with nodes 0..n-1 and a "weight" edge attribute from
+    symmetric CSR arrays, for the algorithms that need networkx.
+    """
+
+    n = len(indptr) - 1
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    upper = rows <= indices
+    # The diagonal holds twice the self-loop weight
+    edge_weights = np.where(rows[upper] == indices[upper], 0.5, 1) * weights[upper]
+
+    G = nx.Graph()
+    G.add_nodes_from(range(n))
+    for u, v, w in zip(rows[upper].tolist(), indices[upper].tolist(), edge_weights.tolist()):
+        if G.has_edge(u, v):
+            G[u][v]["weight"] += w
+        else:
+            G.add_edge(u, v, weight=w)
+    return G
+
+
+def save_graph(path, indptr, indices, weights, node_ids=None):
+    """
+    Writes symmetric CSR arrays to the directory path as indptr.npy,
+    indices.npy, weights.npy, degrees.npy, node_ids.npy and meta.json.
+
+    Indices are stored as int32 when the node count allows it. Node ids
+    that are neither numbers nor strings are stored as strings, so every
+    file can be memory mapped. meta.json is written last and marks the
+    store as complete.
+    """
+
+    n = len(indptr) - 1
+    index_dtype = np.int32 if n < np.iinfo(np.int32).max else np.int64
+    weights = np.asarray(weights, dtype=np.float64)
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    degrees = np.bincount(rows, weights=weights, minlength=n)
+
+    if node_ids is None:
+        node_ids = np.arange(n)
+    node_ids = np.asarray(node_ids)
+    if node_ids.dtype == object:
+        # astype(str) fails on ids that are sequences, e.g. tuples
+        node_ids = np.array([str(node) for node in node_ids.tolist()])
+
+    os.makedirs(path, exist_ok=True)
+    meta_path = os.path.join(path, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    np.save(os.path.join(path, "indptr.npy"), np.asarray(indptr, dtype=np.int64))
+    np.save(os.path.join(path, "indices.npy"), np.asarray(indices, dtype=index_dtype))
+    np.save(os.path.join(path, "weights.npy"), weights)
+    np.save(os.path.join(path, "degrees.npy"), degrees)
+    np.save(os.path.join(path, "node_ids.npy"), node_ids)
+
+    with open(meta_path, "w") as f:
+        json.dump({"version": STORE_VERSION, "num_nodes": n, "num_entries": int(indptr[-1]),
+            "total_weight": float(degrees.sum() / 2)}, f)
+
+
+def open_graph(path, mmap=True):
+    """
+    Opens a graph written by save_graph.
+
+    Parameters
+    ----------
+    path: str
+        Store directory
+    mmap: bool
+        Memory map the arrays read-only (zero-copy, shared between processes
+        through the page cache) instead of reading them into memory
+
+    Returns
+    -------
+    csr: (indptr, indices, weights)
+        For csr_louvains_method, spectral_clustering and girvan_newman
+    degrees: 1D np.array
+        Weighted degree of every node, the k_i of csr_louvains_method
+    node_ids: 1D np.array
+        Original id of every node
+    """
+
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError("No complete graph store at {!r}.".format(path))
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta["version"] != STORE_VERSION:
+        raise ValueError("Unsupported graph store version {}.".format(meta["version"]))
+
+    mmap_mode = "r" if mmap else None
+    arrays = [np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode)
+        for name in ("indptr", "indices", "weights", "degrees", "node_ids")]
+    indptr, indices, weights, degrees, node_ids = arrays
+
+    if len(indptr) != meta["num_nodes"] + 1 or len(indices) != meta["num_entries"]:
+        raise ValueError("Graph store at {!r} does not match its meta.json.".format(path))
+
+    return (indptr, indices, weights), degrees, node_ids
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Converts an edge list into a memory mapped graph store.")
+    parser.add_argument("edgelist")
+    parser.add_argument("store")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--delimiter")
+    parser.add_argument("--nodetype", choices=["int", "str"], default="str")
+    parser.add_argument("--weighted", action="store_true")
+    parser.add_argument("--header", action="store_true")
+    parser.add_argument("--dtype", default="int64", help="Value type of raw binary files")
+    parser.add_argument("--chunk-size", type=int, default=1 << 20)
+    args = parser.parse_args()
+
+    csr, node_ids = read_edgelist(args.edgelist, fmt=args.format, delimiter=args.delimiter,
+        nodetype=int if args.nodetype == "int" else None, weighted=args.weighted, header=args.header,
+        dtype=np.dtype(args.dtype), chunk_size=args.chunk_size)
+    save_graph(args.store, *csr, node_ids=node_ids)
+    print("{} nodes, {} edge entries written to {}".format(len(node_ids), len(csr[1]), args.store))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,19 @@ Original file is located at
     https://colab.research.google.com/drive/14AW8oUIv0Z1QCWJyDiAreieEapTBWoRF
 """
 
-import matplotlib.pyplot as plt
 import networkx as nx
 import numpy as np
+import os
+import random
+from collections import deque
 from heapq import heappush, heappop
 from itertools import count
-from networkx.algorithms.community.centrality import girvan_newman
+from multiprocessing import Pool
 
-def edge_betweenness_centrality(G,normalized=True):
+from cdet.edgelist import csr_to_graph
+from cdet.instrumentation import phase
+
+def edge_betweenness_centrality(G,normalized=True,n_jobs=None,weight=None,k=None,seed=None,return_error=False):
   """
   Calculates the edge-betweenness-centrality score for each edge in graph G.
 
@@ -22,34 +27,175 @@ def edge_betweenness_centrality(G,normalized=True):
   ----------
   G : Graph input of type networkx graph object.
   normalized : Boolean True or False to normalize the betweeness score.
+  n_jobs : Number of worker processes to split the source nodes across.
+           None or 1 runs serially, -1 uses all the cores.
+  weight : Edge attribute holding the edge length, None treats the graph as unweighted.
+  k : Number of random pivot sources used to approximate the scores, None uses every node.
+  seed : Seed or random.Random instance used to draw the pivots.
+  return_error : Also return the estimated standard error of each score.
 
   Returns
   -------
   betweenness : List containing the betweenness score of all the edges
+  error : Standard error of each score, only if return_error is True
   """
+  if k is not None:
+      betweenness, error = sampled_edge_betweenness(G, k, normalized=normalized, weight=weight, seed=seed, n_jobs=n_jobs)
+      return (betweenness, error) if return_error else betweenness
+
+  if n_jobs is not None and n_jobs != 1:
+      betweenness = parallel_edge_betweenness(G, n_jobs, weight=weight)
+      betweenness = rescale_edges(betweenness, len(G), normalized=normalized, directed=G.is_directed())
+      return (betweenness, dict.fromkeys(betweenness, 0.0)) if return_error else betweenness
+
   # Set betweenness of all vertices and edges as zero
   betweenness = dict.fromkeys(G, 0.0) 
   betweenness.update(dict.fromkeys(G.edges(), 0.0))
 
   nodes = G
   for node in nodes:
-      S, parent, sigma = single_source_dijkstra(G, node)
+      S, parent, sigma = single_source_dijkstra(G, node, weight=weight)
       betweenness = get_betweenness(betweenness, S, parent, sigma, node)
   # remove nodes and keep edges
   for n in G:  
       del betweenness[n]
   betweenness = rescale_edges(betweenness, len(G), normalized=normalized, directed=G.is_directed())
-  return betweenness
+  return (betweenness, dict.fromkeys(betweenness, 0.0)) if return_error else betweenness
+
+def sampled_edge_betweenness(G, k, normalized=True, weight=None, seed=None, n_jobs=None):
+  """
+  Approximates edge betweenness from k pivot sources drawn uniformly without
+  replacement, scaled up by n / k. The error of each score is the standard
+  error of that estimator, computed from the spread of the per-pivot
+  contributions with a finite population correction, so it is 0 when k >= n.
+
+  Parameters
+  ----------
+  G : Graph input of type networkx graph object.
+  k : Number of pivot sources.
+  normalized : Boolean True or False to normalize the betweeness score.
+  weight : Edge attribute holding the edge length, None treats the graph as unweighted.
+  seed : Seed or random.Random instance used to draw the pivots.
+  n_jobs : Number of worker processes to split the pivots across.
+
+  Returns
+  -------
+  betweenness : Dictionary of the approximate betweenness keyed by the edges of G
+  error : Dictionary of the standard error of each score
+  """
+  rng = seed if isinstance(seed, random.Random) else random.Random(seed)
+  n = len(G)
+  pivots = rng.sample(list(G), k) if k < n else list(G)
+  k = len(pivots)
+
+  edges = list(G.edges())
+  edge_index = {}
+  for i, (u, v) in enumerate(edges):
+      edge_index[(u, v)] = i
+      edge_index[(v, u)] = i
+
+  if n_jobs is not None and n_jobs != 1:
+      if n_jobs < 0:
+          n_jobs = os.cpu_count()
+      n_chunks = min(k, n_jobs * 4)
+      chunks = [pivots[i::n_chunks] for i in range(n_chunks)]
+      total = np.zeros(len(edges))
+      total_sq = np.zeros(len(edges))
+      with Pool(n_jobs, initializer=_init_betweenness_worker, initargs=(G, edge_index, weight)) as pool:
+          for partial, partial_sq in pool.imap(_partial_betweenness_moments, chunks):
+              total += partial
+              total_sq += partial_sq
+  else:
+      total, total_sq = _betweenness_moments(G, edge_index, pivots, weight=weight)
+
+  if 1 < k:
+      variance = np.maximum(total_sq - total ** 2 / k, 0) / (k - 1)
+      std_error = n * np.sqrt(variance / k * (1 - k / n))
+  else:
+      std_error = np.full(len(edges), np.inf)
+
+  betweenness = rescale_edges(dict(zip(edges, total.tolist())), n, normalized=normalized, directed=G.is_directed(), k=k)
+  error = rescale_edges(dict(zip(edges, std_error.tolist())), n, normalized=normalized, directed=G.is_directed())
+  return betweenness, error
+
+def parallel_edge_betweenness(G, n_jobs, weight=None, sources=None):
+  """
+  Accumulates the unscaled edge betweenness of G with the source nodes split
+  across a process pool. Each worker sums its sources into an array indexed
+  by edge id and the partial arrays are added up at the end.
+
+  Parameters
+  ----------
+  G : Graph input of type networkx graph object.
+  n_jobs : Number of worker processes, -1 uses all the cores.
+  weight : Edge attribute holding the edge length, None treats the graph as unweighted.
+  sources : Source nodes to accumulate, None uses every node of G.
 
-def single_source_dijkstra(G, node):
+  Returns
+  -------
+  betweenness : Dictionary of unscaled betweenness keyed by the edges of G
+  """
+  if n_jobs < 0:
+      n_jobs = os.cpu_count()
+  edges = list(G.edges())
+  edge_index = {}
+  for i, (u, v) in enumerate(edges):
+      edge_index[(u, v)] = i
+      edge_index[(v, u)] = i
+
+  nodes = list(G) if sources is None else list(sources)
+  if not nodes:
+      return dict.fromkeys(edges, 0.0)
+  n_chunks = min(len(nodes), n_jobs * 4)
+  chunks = [nodes[i::n_chunks] for i in range(n_chunks)]
+
+  total = np.zeros(len(edges))
+  with Pool(n_jobs, initializer=_init_betweenness_worker, initargs=(G, edge_index, weight)) as pool:
+      for partial in pool.imap(_partial_betweenness, chunks):
+          total += partial
+  return dict(zip(edges, total.tolist()))
+
+def _init_betweenness_worker(G, edge_index, weight):
+  global _worker_graph, _worker_edge_index, _worker_weight
+  _worker_graph = G
+  _worker_edge_index = edge_index
+  _worker_weight = weight
+
+def _partial_betweenness_moments(sources):
+  return _betweenness_moments(_worker_graph, _worker_edge_index, sources, weight=_worker_weight)
+
+def _betweenness_moments(G, edge_index, sources, weight=None):
+  """
+  Sums and sums of squares over sources of the per-source edge
+  contributions, as arrays indexed by the ids in edge_index.
+  """
+  total = np.zeros(len(G.edges))
+  total_sq = np.zeros(len(G.edges))
+  for node in sources:
+      S, parent, sigma = single_source_dijkstra(G, node, weight=weight)
+      partial = get_edge_betweenness(np.zeros(len(total)), edge_index, S, parent, sigma)
+      total += partial
+      total_sq += partial ** 2
+  return total, total_sq
+
+def _partial_betweenness(sources):
+  partial = np.zeros(len(_worker_graph.edges))
+  for node in sources:
+      S, parent, sigma = single_source_dijkstra(_worker_graph, node, weight=_worker_weight)
+      get_edge_betweenness(partial, _worker_edge_index, S, parent, sigma)
+  return partial
+
+def single_source_dijkstra(G, node, weight=None):
   """
   Performs Djikstra's shortest path algorithm to find the shortest path
-  between the given node and all the other vertices in G
+  between the given node and all the other vertices in G. Unweighted graphs
+  (weight=None) take the single_source_bfs path instead.
 
   Parameters
   ----------
   G : Graph input of type networkx graph object.
   node : Source node from which we find the shortest path to all the other vertices
+  weight : Edge attribute holding the edge length, edges without it have length 1
 
   Returns
   -------
@@ -57,6 +203,9 @@ def single_source_dijkstra(G, node):
   parent : List containing the parents of each node
   sigma :  List containing the number of shortest paths from node to all other vertices
   """
+  if weight is None:
+      return single_source_bfs(G, node)
+
   S = []
   parent = {}
   for v in G:
@@ -76,7 +225,7 @@ def single_source_dijkstra(G, node):
       S.append(u)
       distance[u] = dist
       for v, edgedata in G[u].items():
-          uv_dist = dist + edgedata.get(None, 1)
+          uv_dist = dist + edgedata.get(weight, 1)
           if v not in distance and (v not in seen or uv_dist < seen[v]):
               seen[v] = uv_dist
               heappush(Q, (uv_dist, next(c), u, v))
@@ -88,6 +237,45 @@ def single_source_dijkstra(G, node):
   return S, parent, sigma
 
 
+def single_source_bfs(G, node):
+  """
+  Breadth-first search counterpart of single_source_dijkstra for unweighted
+  graphs. Uses a plain queue, so there is no heap or tie-breaker counter.
+
+  Parameters
+  ----------
+  G : Graph input of type networkx graph object.
+  node : Source node from which we find the shortest path to all the other vertices
+
+  Returns
+  -------
+  S : List of nodes that were travered
+  parent : List containing the parents of each node
+  sigma :  List containing the number of shortest paths from node to all other vertices
+  """
+  S = []
+  parent = {}
+  for v in G:
+      parent[v] = []
+  sigma = dict.fromkeys(G, 0.0)
+  distance = {node: 0}
+  sigma[node] = 1.0
+  Q = deque([node])
+  while Q:
+      u = Q.popleft()
+      S.append(u)
+      uv_dist = distance[u] + 1
+      sigma_u = sigma[u]
+      for v in G[u]:
+          if v not in distance:
+              distance[v] = uv_dist
+              Q.append(v)
+          if distance[v] == uv_dist:
+              sigma[v] += sigma_u
+              parent[v].append(u)
+  return S, parent, sigma
+
+
 def get_betweenness(betweenness, S, parent, sigma, s):
   delta = dict.fromkeys(S, 0)
   while S:
@@ -104,6 +292,21 @@ def get_betweenness(betweenness, S, parent, sigma, s):
           betweenness[v] += delta[v]
   return betweenness
 
+def get_edge_betweenness(partial, edge_index, S, parent, sigma):
+  """
+  Same accumulation as get_betweenness, restricted to edges and written into
+  an array indexed by the ids in edge_index.
+  """
+  delta = dict.fromkeys(S, 0)
+  while S:
+      v = S.pop()
+      coeff = (1 + delta[v]) / sigma[v]
+      for u in parent[v]:
+          c = sigma[u] * coeff
+          partial[edge_index[(u, v)]] += c
+          delta[u] += c
+  return partial
+
 def rescale_edges(betweenness, n, normalized, directed=False, k=None):
     if normalized:
         if n <= 1:
@@ -116,46 +319,224 @@ def rescale_edges(betweenness, n, normalized, directed=False, k=None):
             scale = 0.5
         else:
             scale = None
+    if k is not None:
+        scale = (1 if scale is None else scale) * n / k
     if scale is not None:
-        if k is not None:
-            scale = scale * n / k
         for u in betweenness:
             betweenness[u] *= scale
     return betweenness
 
-def edge_to_remove(graph):
-  ebc_per_edge = edge_betweenness_centrality(graph)
-  edge = ()
-  for key, value in sorted(ebc_per_edge.items(), key=lambda item: item[1], reverse = True):
-      edge = key
-      break
-  return edge
+def edge_to_remove(graph, weight=None, k=None, seed=None, n_jobs=None):
+  ebc_per_edge = edge_betweenness_centrality(graph, weight=weight, k=k, seed=seed, n_jobs=n_jobs)
+  if not ebc_per_edge:
+      return ()
+  return max(ebc_per_edge, key=ebc_per_edge.get)
 
-def girvan_newman(graph, num_communities):
+def update_edge_betweenness(betweenness, S, parent, sigma, scale):
+  """
+  Adds scale times the edge contributions of one source to betweenness.
+  A negative scale takes back a contribution added earlier.
+  """
+  delta = dict.fromkeys(S, 0)
+  while S:
+      v = S.pop()
+      coeff = (1 + delta[v]) / sigma[v]
+      for u in parent[v]:
+          c = sigma[u] * coeff
+          if (u, v) in betweenness:
+              betweenness[(u, v)] += scale * c
+          else:
+              betweenness[(v, u)] += scale * c
+          delta[u] += c
+  return betweenness
+
+def remove_edge_and_update(graph, betweenness, edge, weight=None, stats=None, n_jobs=None):
+  """
+  Removes edge from graph and brings the unnormalized betweenness scores
+  (as returned with normalized=False) up to date without a full recompute.
+
+  Only sources in the component that contained edge can change. Of those,
+  a source is affected only if edge lies on its shortest-path DAG, i.e. its
+  distances to the two endpoints differ by the edge length. If few sources
+  are affected their old contributions are subtracted and the new ones
+  added, otherwise the whole component is recomputed.
+
+  Parameters
+  ----------
+  graph : Graph object of type networkx, modified in place
+  betweenness : Dictionary of unnormalized betweenness keyed by edge, modified in place
+  edge : Edge to remove
+  weight : Edge attribute holding the edge length, None treats the graph as unweighted
+  stats : cdet.instrumentation.Stats that counts the recomputed sources, optional
+  n_jobs : Number of worker processes to split the recomputed sources across,
+           see add_source_betweenness. None or 1 runs serially
+
+  Returns
+  -------
+  component : Set of nodes of the component that contained edge
+  """
+  u, v = edge
+  if weight is None:
+      length = 1
+      dist_u = nx.single_source_shortest_path_length(graph, u)
+      dist_v = nx.single_source_shortest_path_length(graph, v)
+  else:
+      length = graph[u][v].get(weight, 1)
+      dist_u = nx.single_source_dijkstra_path_length(graph, u, weight=weight)
+      dist_v = nx.single_source_dijkstra_path_length(graph, v, weight=weight)
+
+  component = set(dist_u)
+  # |d(s, u) - d(s, v)| never exceeds the edge length, it equals it only
+  # when the edge is on a shortest path from s
+  affected = [s for s in dist_u if abs(dist_u[s] - dist_v[s]) >= length * (1 - 1e-9)]
+  subgraph = graph.subgraph(component).copy() if len(component) < len(graph) else graph
+  scale = 0.5 if not graph.is_directed() else 1
+
+  if 2 * len(affected) + 2 < len(component):
+      if stats is not None:
+          stats.count("partial_updates")
+          stats.count("sources_recomputed", 2 * len(affected))
+      add_source_betweenness(subgraph, betweenness, affected, -scale, weight=weight, n_jobs=n_jobs)
+      graph.remove_edge(u, v)
+      if subgraph is not graph:
+          subgraph.remove_edge(u, v)
+      del betweenness[edge]
+      add_source_betweenness(subgraph, betweenness, affected, scale, weight=weight, n_jobs=n_jobs)
+  else:
+      if stats is not None:
+          stats.count("component_recomputes")
+          stats.count("sources_recomputed", len(component))
+      graph.remove_edge(u, v)
+      if subgraph is not graph:
+          subgraph.remove_edge(u, v)
+      del betweenness[edge]
+      for x, y in subgraph.edges():
+          betweenness[(x, y) if (x, y) in betweenness else (y, x)] = 0.0
+      add_source_betweenness(subgraph, betweenness, component, scale, weight=weight, n_jobs=n_jobs)
+  return component
+
+# Below this many sources starting a process pool costs more than it saves
+MIN_PARALLEL_SOURCES = 100
+
+def add_source_betweenness(graph, betweenness, sources, scale, weight=None, n_jobs=None):
+  """
+  Adds scale times the edge contributions of every source in sources to
+  betweenness, like update_edge_betweenness for each of them. With n_jobs
+  set (other than 1) and at least MIN_PARALLEL_SOURCES sources, they are
+  split across a process pool with parallel_edge_betweenness.
+  """
+  if n_jobs is not None and n_jobs != 1 and len(sources) >= MIN_PARALLEL_SOURCES:
+      partial = parallel_edge_betweenness(graph, n_jobs, weight=weight, sources=sources)
+      for (x, y), c in partial.items():
+          betweenness[(x, y) if (x, y) in betweenness else (y, x)] += scale * c
+      return betweenness
+  for s in sources:
+      S, parent, sigma = single_source_dijkstra(graph, s, weight=weight)
+      update_edge_betweenness(betweenness, S, parent, sigma, scale)
+  return betweenness
+
+def girvan_newman(graph, num_communities, weight=None, incremental=True, k=None, seed=None, stats=None, n_jobs=None):
   """
   Perform Girvan Neuman Divisive community detection 
 
   Parameters 
   ----------
-  graph : Graph object of type networkx
+  graph : Graph object of type networkx, or the (indptr, indices, weights) arrays
+          of cdet.edgelist.read_edgelist, converted with csr_to_graph
   num_communities : Number of communities that we want to detect in the graph
+  weight : Edge attribute holding the edge length, None treats the graph as unweighted
+  incremental : Update the betweenness scores after each removal with
+                remove_edge_and_update instead of recomputing them for the whole graph
+  k : Pick each edge from betweenness approximated with k random pivot sources,
+      recomputed after every removal. None uses exact scores.
+  seed : Seed for the pivot sampling
+  stats : cdet.instrumentation.Stats to record betweenness and component
+          counting times, edges removed and the component count trace into
+  n_jobs : Number of worker processes for the betweenness, both the initial
+           scores and the recomputes after each removal. None or 1 runs
+           serially, -1 uses all the cores
 
   Returns
   -------
   cc_node_set : List conatining sets of connected components or communities detected
   removed_edges : Edges that were removed from the graph to get the connected componnets
   """
-  cc_node_set = nx.connected_components(graph)
-  cc_count = nx.number_connected_components(graph)
+  if isinstance(graph, tuple):
+      graph = csr_to_graph(*graph)
+  # Component label of every node, by position in graph. Only the component
+  # of a removed edge is re-checked, see split_component
+  index = {node: i for i, node in enumerate(graph)}
+  labels = [0] * len(index)
+  cc_count = 0
+  for component in nx.connected_components(graph):
+      for node in component:
+          labels[index[node]] = cc_count
+      cc_count += 1
   removed_edges = []
+  incremental = incremental and k is None
+  if incremental:
+      with phase(stats, "betweenness"):
+          betweenness = edge_betweenness_centrality(graph, normalized=False, weight=weight, n_jobs=n_jobs)
+  else:
+      rng = random.Random(seed)
 
   while(cc_count < num_communities):
-    edge = edge_to_remove(graph)
+    with phase(stats, "betweenness"):
+        if incremental:
+            edge = max(betweenness, key=betweenness.get)
+            remove_edge_and_update(graph, betweenness, edge, weight=weight, stats=stats, n_jobs=n_jobs)
+        else:
+            edge = edge_to_remove(graph, weight=weight, k=k, seed=rng, n_jobs=n_jobs)
+            graph.remove_edge(edge[0], edge[1])
     removed_edges.append(edge)
-    graph.remove_edge(edge[0], edge[1])
-    cc_node_set = nx.connected_components(graph)
-    cc_count = nx.number_connected_components(graph)
-  return cc_node_set, removed_edges
+    with phase(stats, "components"):
+        piece = split_component(graph, edge[0], edge[1])
+        if piece is not None:
+            for node in piece:
+                labels[index[node]] = cc_count
+            cc_count += 1
+    if stats is not None:
+        stats.count("edges_removed")
+        stats.trace("components", cc_count)
+
+  # Same order as nx.connected_components, by the first node of each component
+  cc_node_set = {label: set() for label in dict.fromkeys(labels)}
+  for node, i in index.items():
+      cc_node_set[labels[i]].add(node)
+  return list(cc_node_set.values()), removed_edges
+
+def split_component(graph, u, v):
+  """
+  Checks whether removing the edge (u, v) split its component. Breadth first
+  searches from u and v are grown one node at a time in turn, so the work is
+  bounded by the smaller side when the component splits, and the searches
+  usually meet quickly when it does not.
+
+  Parameters
+  ----------
+  graph : Graph object of type networkx, with the edge already removed
+  u, v : Endpoints of the removed edge
+
+  Returns
+  -------
+  piece : Set of nodes of the side that was cut off, the smaller one, or None
+          if u and v are still connected
+  """
+  if u == v:
+      return None
+  seen = ({u}, {v})
+  queues = (deque([u]), deque([v]))
+  while 1:
+      for side in (0, 1):
+          if not queues[side]:
+              return seen[side]
+          node = queues[side].popleft()
+          for neighbor in graph[node]:
+              if neighbor in seen[1 - side]:
+                  return None
+              if neighbor not in seen[side]:
+                  seen[side].add(neighbor)
+                  queues[side].append(neighbor)
 
 def get_remaining_edges(graph, removed_edges):
   for edge in removed_edges:
@@ -163,70 +544,77 @@ def get_remaining_edges(graph, removed_edges):
       graph.remove_edge(edge[0], edge[1])
   return graph
 
-"""### Zachary's Karate Club"""
-
-# Original Zachary's Karate Club graph
-G = nx.karate_club_graph()
-pos = nx.spring_layout(G, k=0.1, iterations=30, scale=1.3)
-nx.draw_networkx_nodes(G, pos=pos)
-nx.draw_networkx_labels(G, pos=pos)
-nx.draw_networkx_edges(G, pos=pos, width=2,alpha=1,edge_color='k')
-plt.show()
-
-# Girvan Newman with k = 5 community detection
-num_communities = 5
-communities, removed_edges = girvan_newman(G,num_communities)
-G = get_remaining_edges(G, removed_edges)
-node_groups = []
-
-colors = ['yellow', 'green','blue','red','cyan']
-
-for i in communities:
-  node_groups.append(list(i))
-
-color_map = []
-for node in G: 
-  for i in range(len(node_groups)):
-    if node in node_groups[i]:
-      color_map.append(colors[i])  
-
-pos = nx.spring_layout(G, k=0.1, iterations=30, scale=1.3)
-nx.draw_networkx_nodes(G, pos=pos, node_color=color_map)
-nx.draw_networkx_labels(G, pos=pos)
-nx.draw_networkx_edges(G, pos=pos, edgelist=removed_edges, width=2, edge_color='k', style='dashed')
-nx.draw_networkx_edges(G, pos=pos, width=2,alpha=1,edge_color='k')
-plt.show()
-
-"""### Planted L-Partition"""
-
-# Original Planted L-Partition Graph
-G = nx.planted_partition_graph(5,30,0.8,0.1)
-pos = nx.spring_layout(G, k=0.1, iterations=30, scale=1.3)
-nx.draw_networkx_nodes(G, pos=pos)
-nx.draw_networkx_labels(G, pos=pos)
-nx.draw_networkx_edges(G, pos=pos, width=2,alpha=1,edge_color='k')
-plt.show()
-
-# Girvan Newman with k = 5 community detection
-num_communities = 5
-communities, removed_edges = girvan_newman(G,num_communities)
-G = get_remaining_edges(G, removed_edges)
-node_groups = []
-
-colors = ['yellow', 'green','blue','red','cyan']
-
-for i in communities:
-  node_groups.append(list(i))
-
-color_map = []
-for node in G: 
-  for i in range(len(node_groups)):
-    if node in node_groups[i]:
-      color_map.append(colors[i])
-
-pos = nx.spring_layout(G, k=0.1, iterations=15, scale=10)
-nx.draw_networkx_nodes(G, pos=pos, node_color=color_map)
-nx.draw_networkx_labels(G, pos=pos)
-nx.draw_networkx_edges(G, pos=pos, edgelist=removed_edges, width=0.25, edge_color='k', style='dashed')
-nx.draw_networkx_edges(G, pos=pos, width=1,alpha=1,edge_color='k')
-plt.show()
\ No newline at end of file
+def main():
+  import matplotlib.pyplot as plt
+
+  ## Zachary's Karate Club
+
+  # Original Zachary's Karate Club graph
+  G = nx.karate_club_graph()
+  pos = nx.spring_layout(G, k=0.1, iterations=30, scale=1.3)
+  nx.draw_networkx_nodes(G, pos=pos)
+  nx.draw_networkx_labels(G, pos=pos)
+  nx.draw_networkx_edges(G, pos=pos, width=2,alpha=1,edge_color='k')
+  plt.show()
+
+  # Girvan Newman with k = 5 community detection
+  num_communities = 5
+  communities, removed_edges = girvan_newman(G,num_communities)
+  G = get_remaining_edges(G, removed_edges)
+  node_groups = []
+
+  colors = ['yellow', 'green','blue','red','cyan']
+
+  for i in communities:
+    node_groups.append(list(i))
+
+  color_map = []
+  for node in G: 
+    for i in range(len(node_groups)):
+      if node in node_groups[i]:
+        color_map.append(colors[i])  
+
+  pos = nx.spring_layout(G, k=0.1, iterations=30, scale=1.3)
+  nx.draw_networkx_nodes(G, pos=pos, node_color=color_map)
+  nx.draw_networkx_labels(G, pos=pos)
+  nx.draw_networkx_edges(G, pos=pos, edgelist=removed_edges, width=2, edge_color='k', style='dashed')
+  nx.draw_networkx_edges(G, pos=pos, width=2,alpha=1,edge_color='k')
+  plt.show()
+
+  ## Planted L-Partition
+
+  # Original Planted L-Partition Graph
+  G = nx.planted_partition_graph(5,30,0.8,0.1)
+  pos = nx.spring_layout(G, k=0.1, iterations=30, scale=1.3)
+  nx.draw_networkx_nodes(G, pos=pos)
+  nx.draw_networkx_labels(G, pos=pos)
+  nx.draw_networkx_edges(G, pos=pos, width=2,alpha=1,edge_color='k')
+  plt.show()
+
+  # Girvan Newman with k = 5 community detection
+  num_communities = 5
+  communities, removed_edges = girvan_newman(G,num_communities)
+  G = get_remaining_edges(G, removed_edges)
+  node_groups = []
+
+  colors = ['yellow', 'green','blue','red','cyan']
+
+  for i in communities:
+    node_groups.append(list(i))
+
+  color_map = []
+  for node in G: 
+    for i in range(len(node_groups)):
+      if node in node_groups[i]:
+        color_map.append(colors[i])
+
+  pos = nx.spring_layout(G, k=0.1, iterations=15, scale=10)
+  nx.draw_networkx_nodes(G, pos=pos, node_color=color_map)
+  nx.draw_networkx_labels(G, pos=pos)
+  nx.draw_networkx_edges(G, pos=pos, edgelist=removed_edges, width=0.25, edge_color='k', style='dashed')
+  nx.draw_networkx_edges(G, pos=pos, width=1,alpha=1,edge_color='k')
+  plt.show()
+
+
+if __name__ == "__main__":
+  main()
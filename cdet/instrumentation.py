@@ -0,0 +1,78 @@
+"""
+Optional instrumentation for the community detection loops.
+
+Functions that accept a stats argument record into it when one is given:
+
+    stats = Stats()
+    partition, modularity = csr_louvains_method(indptr, indices, weights, stats=stats)
+    stats.as_dict()
+
+With stats=None (the default) nothing is recorded and the loops only pay
+for a handful of `is None` checks per phase.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+_NO_TIMER = nullcontext()
+
+
+class Stats:
+    """
+    Per-phase timers, counters and convergence traces of an instrumented run.
+
+    Parameters
+    ----------
+    callback: callable
+        Called as callback(name, value, stats) for every traced value, e.g.
+        the number of moves of each local moving sweep. It can feed a
+        metrics pipeline, or raise to abort a run on a pathological input.
+    """
+
+    def __init__(self, callback=None):
+        self.timers = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.traces = defaultdict(list)
+        self.callback = callback
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def trace(self, name, value):
+        self.traces[name].append(value)
+        if self.callback is not None:
+            self.callback(name, value, self)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+
+    def as_dict(self):
+        """
+        Plain dict of everything recorded, suitable for json.dumps.
+        """
+
+        return {
+            "timers": dict(self.timers),
+            "counters": dict(self.counters),
+            "traces": {name: list(values) for name, values in self.traces.items()},
+        }
+
+    def __repr__(self):
+        return "Stats(timers={}, counters={})".format(dict(self.timers), dict(self.counters))
+
+
+def phase(stats, name):
+    """
+    stats.timer(name), or a shared no-op context manager when stats is None.
+    """
+
+    if stats is None:
+        return _NO_TIMER
+    return stats.timer(name)
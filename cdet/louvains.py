@@ -1,39 +1,57 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+import hashlib
 import networkx as nx
+import numpy as np
+import os
+from collections import OrderedDict, deque
+from multiprocessing import Pool, RawArray
 
-def louvains_method(nodes, edges, m, k_i, w, edges_of_node, communities, actual_partition):
+from cdet.instrumentation import phase
+from cdet.partition import Partition
+
+def louvains_method(nodes, edges, m, k_i, w, edges_of_node, communities, actual_partition, stats=None, resolution=1, active_set=False, seed=None, as_partition=False):
 
     best_community_list = [[n] for n in nodes]
     modularity = -1
+    # Community of every node of the first level, composed level by level
+    membership = None
+    optimisation = queue_modularity_optimisation if active_set else modularity_optimisation
+    # With a seed every level visits its nodes in a random order
+    rng = np.random.default_rng(seed) if seed is not None else None
 
     while 1:
 
-        community_list, communities, sigma_in, sigma_tot = modularity_optimisation(nodes, edges, communities, edges_of_node, w, k_i, m)
+        if stats is not None:
+            stats.count("levels")
+            stats.trace("nodes_per_level", len(nodes))
+
+        with phase(stats, "local_moving"):
+            order = [nodes[i] for i in rng.permutation(len(nodes))] if rng is not None else None
+            community_list, communities, sigma_in, sigma_tot = optimisation(nodes, edges, communities, edges_of_node, w, k_i, m, stats=stats, resolution=resolution, order=order)
 
         new_modularity = 0
         for i in range(len(community_list)):
-            new_modularity += sigma_in[i] / (m*2) - (sigma_tot[i] / (m*2) ) ** 2
-
-        community_list = [n for n in community_list if n]
-
-        if actual_partition:
-            actual = []
-            for p in community_list:
-                part = []
-                for node in p:
-                    part.extend(actual_partition[node])
-                actual.append(part)
-            actual_partition = actual
-            
-        else:
-            actual_partition = community_list
-            
+            new_modularity += sigma_in[i] / (m*2) - resolution * (sigma_tot[i] / (m*2) ) ** 2
+
+        if stats is not None:
+            stats.trace("modularity", new_modularity)
+
+        # Same order as the relabeling in community_aggregation
+        relabel = dict.fromkeys(communities)
+        community_list = [community_list[c] for c in relabel]
+
+        lookup = np.empty(max(relabel) + 1, dtype=np.int64)
+        lookup[list(relabel)] = np.arange(len(relabel))
+        level_membership = lookup[np.asarray(communities)]
+        membership = level_membership if membership is None else level_membership[membership]
+
         if new_modularity == modularity:
             break
   
-        new_nodes, new_edges, k_i, edges_of_node, w, communities = community_aggregation(nodes, edges, community_list, k_i, edges_of_node, communities, w)
+        with phase(stats, "aggregation"):
+            new_nodes, new_edges, k_i, edges_of_node, w, communities = community_aggregation(nodes, edges, community_list, k_i, edges_of_node, communities, w)
         
         nodes = new_nodes
         edges = new_edges
@@ -41,12 +59,17 @@ def louvains_method(nodes, edges, m, k_i, w, edges_of_node, communities, actual_
         best_community_list = community_list
         modularity = new_modularity
 
-    
-    return (actual_partition, modularity)
+    partition = Partition(membership)
+    if actual_partition:
+        # Expand every first level node into the nodes it stands for
+        partition = [[v for node in part for v in actual_partition[node]] for part in partition.to_list()]
+        return (Partition.from_communities(partition) if as_partition else partition, modularity)
 
+    return (partition if as_partition else partition.to_list(), modularity)
 
 
-def modularity_optimisation(nodes, edges, communities, edges_of_node, w, k_i, m):
+
+def modularity_optimisation(nodes, edges, communities, edges_of_node, w, k_i, m, stats=None, resolution=1, order=None):
 
     best_community_list = [[node] for node in nodes]
     sigma_in = [0 for node in nodes]
@@ -59,10 +82,10 @@ def modularity_optimisation(nodes, edges, communities, edges_of_node, w, k_i, m)
     while 1:
         
         community_check = 0
-        for node in nodes:
+        moves = 0
+        for node in nodes if order is None else order:
             comm = communities[node]
             best_community = comm
-            best_gain = 0
 
             if node not in best_community_list[comm]:
                 continue
@@ -80,6 +103,9 @@ def modularity_optimisation(nodes, edges, communities, edges_of_node, w, k_i, m)
             sigma_in[comm] -= 2 * (best_weight + w[node])
             sigma_tot[comm] -= k_i[node]
             communities[node] = -1
+            # Staying is the gain to beat. Moves that do not improve on it by
+            # more than rounding error can cycle between ties forever
+            best_gain = max(0, 2 * best_weight - resolution * sigma_tot[comm] * k_i[node] / m)
             lcommunities = {}
             
             neighborsu = []
@@ -109,9 +135,9 @@ def modularity_optimisation(nodes, edges, communities, edges_of_node, w, k_i, m)
                     if e[0][0] == node and communities[e[0][1]] == community or e[0][1] == node and communities[e[0][0]] == community:
                         edge_weights += e[1]
 
-                delta_modularity = 2 * edge_weights - sigma_tot[community] * k_i[node] / m
+                delta_modularity = 2 * edge_weights - resolution * sigma_tot[community] * k_i[node] / m
                 
-                if delta_modularity > best_gain:
+                if delta_modularity > best_gain + 1e-10 * k_i[node]:
                     best_community = community
                     best_gain = delta_modularity
                     best_weight = edge_weights
@@ -124,7 +150,13 @@ def modularity_optimisation(nodes, edges, communities, edges_of_node, w, k_i, m)
             
             if comm != best_community:
                 community_check = 1
-                
+                moves += 1
+
+        if stats is not None:
+            stats.count("sweeps")
+            stats.count("moves", moves)
+            stats.trace("moves_per_sweep", moves)
+
         if not community_check:
             break
 
@@ -133,6 +165,80 @@ def modularity_optimisation(nodes, edges, communities, edges_of_node, w, k_i, m)
 
 
 
+def queue_modularity_optimisation(nodes, edges, communities, edges_of_node, w, k_i, m, stats=None, resolution=1, order=None):
+    """
+    Active-set variant of modularity_optimisation with the same arguments
+    and results. Instead of sweeping over all nodes until a sweep moves
+    none, nodes are taken from a work queue that starts with every node in
+    nodes (or order) order. A node that changes community queues its neighbors outside
+    its new community. Neighbor-community weights are gathered in one pass
+    over the edges of a node, and community membership is kept only in
+    communities, with the lists built once at the end.
+    """
+
+    sigma_in = [0 for node in nodes]
+    sigma_tot = [k_i[node] for node in nodes]
+    for edge in edges:
+        if edge[0][0] == edge[0][1]:
+            sigma_in[edge[0][0]] += edge[1]
+            sigma_in[edge[0][1]] += edge[1]
+
+    # Neighbors of every node with the edge weight, self-loops left out
+    adjacency = {}
+    for node in nodes:
+        adjacency[node] = [(e[0][1] if e[0][0] == node else e[0][0], e[1]) for e in edges_of_node.get(node, ()) if e[0][0] != e[0][1]]
+
+    queue = deque(nodes if order is None else order)
+    queued = [True for node in nodes]
+    visits = moves = 0
+
+    while queue:
+        node = queue.popleft()
+        queued[node] = False
+        visits += 1
+        comm = communities[node]
+
+        neighbor_weights = {}
+        for neighbor, weight in adjacency[node]:
+            community = communities[neighbor]
+            neighbor_weights[community] = neighbor_weights.get(community, 0) + weight
+
+        best_weight = neighbor_weights.get(comm, 0)
+        sigma_in[comm] -= 2 * (best_weight + w[node])
+        sigma_tot[comm] -= k_i[node]
+
+        best_community = comm
+        # As in modularity_optimisation
+        best_gain = max(0, 2 * best_weight - resolution * sigma_tot[comm] * k_i[node] / m)
+        for community, edge_weights in neighbor_weights.items():
+            delta_modularity = 2 * edge_weights - resolution * sigma_tot[community] * k_i[node] / m
+            if delta_modularity > best_gain + 1e-10 * k_i[node]:
+                best_community = community
+                best_gain = delta_modularity
+                best_weight = edge_weights
+
+        communities[node] = best_community
+        sigma_in[best_community] += 2 * (best_weight + w[node])
+        sigma_tot[best_community] += k_i[node]
+
+        if comm != best_community:
+            moves += 1
+            for neighbor, _ in adjacency[node]:
+                if not queued[neighbor] and communities[neighbor] != best_community:
+                    queued[neighbor] = True
+                    queue.append(neighbor)
+
+    if stats is not None:
+        stats.count("queue_visits", visits)
+        stats.count("moves", moves)
+
+    best_community_list = [[] for node in nodes]
+    for node in nodes:
+        best_community_list[communities[node]].append(node)
+
+    return best_community_list, communities, sigma_in, sigma_tot
+
+
 def community_aggregation(nodes, edges, community_list, k_i, edges_of_node, communities, w):
 
     new_nodes = [i for i in range(len(community_list))]
@@ -216,6 +322,940 @@ def add_weight_to_edge(edges):
 
 
 
+def edges_to_csr(nodes, edges):
+    """
+    Builds symmetric CSR arrays (indptr, indices, weights) from a list of
+    ((u, v), w) edges. Rows keep the neighbor order of get_edges_of_node and
+    a self-loop of weight w adds 2 * w to the diagonal, so row sums are k_i.
+    """
+
+    src = np.array([e[0][0] for e in edges], dtype=np.int64)
+    dst = np.array([e[0][1] for e in edges], dtype=np.int64)
+    weights = np.array([e[1] for e in edges], dtype=np.float64)
+
+    return _edge_arrays_to_csr(len(nodes), src, dst, weights)
+
+
+def _edge_arrays_to_csr(n, src, dst, weights):
+
+    rows = np.concatenate((src, dst))
+    order = np.argsort(rows, kind="stable")
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    indices = np.concatenate((dst, src))[order]
+    weights = np.concatenate((weights, weights))[order]
+
+    return indptr, indices, weights
+
+
+def _csr_to_edge_arrays(indptr, indices, weights):
+
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    upper = rows <= indices
+    src = rows[upper]
+    dst = indices[upper]
+    weights = np.where(src == dst, 0.5, 1) * weights[upper]
+
+    return src, dst, weights
+
+
+def csr_modularity_optimisation(indptr, indices, weights, k_i, m, communities, stats=None, resolution=1, order=None):
+    """
+    Local moving phase of Louvain on CSR arrays. Neighbor-community weights
+    of a node are gathered in a single pass over its row. Every sweep visits
+    the nodes in order, 0..n-1 if None.
+    """
+
+    n = len(k_i)
+    sigma_tot = np.bincount(communities, weights=k_i, minlength=n).tolist()
+    communities = communities.tolist()
+    k = k_i.tolist()
+    row_start = indptr.tolist()
+    neighbors = indices.tolist()
+    edge_weight = weights.tolist()
+
+    while 1:
+
+        community_check = 0
+        moves = 0
+        for node in range(n) if order is None else order:
+            comm = communities[node]
+            k_node = k[node]
+
+            neighbor_weights = {}
+            for idx in range(row_start[node], row_start[node + 1]):
+                neighbor = neighbors[idx]
+                if neighbor == node:
+                    continue
+                community = communities[neighbor]
+                neighbor_weights[community] = neighbor_weights.get(community, 0) + edge_weight[idx]
+
+            sigma_tot[comm] -= k_node
+            best_community = comm
+            best_gain = 0
+            # Staying is the gain to beat. Moves that do not improve on it by
+            # more than rounding error can cycle between ties forever
+            if comm in neighbor_weights:
+                best_gain = max(0, 2 * neighbor_weights[comm] - resolution * sigma_tot[comm] * k_node / m)
+
+            for community, edge_weights in neighbor_weights.items():
+                delta_modularity = 2 * edge_weights - resolution * sigma_tot[community] * k_node / m
+                if delta_modularity > best_gain + 1e-10 * k_node:
+                    best_community = community
+                    best_gain = delta_modularity
+
+            communities[node] = best_community
+            sigma_tot[best_community] += k_node
+
+            if comm != best_community:
+                community_check = 1
+                moves += 1
+
+        if stats is not None:
+            stats.count("sweeps")
+            stats.count("moves", moves)
+            stats.trace("moves_per_sweep", moves)
+
+        if not community_check:
+            break
+
+    communities = np.array(communities, dtype=np.int64)
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    internal = communities[rows] == communities[indices]
+    sigma_in = np.bincount(communities[rows[internal]], weights=weights[internal], minlength=n)
+
+    return communities, sigma_in, np.array(sigma_tot)
+
+
+def parallel_modularity_optimisation(indptr, indices, weights, k_i, m, communities, n_jobs=None, tol=1e-7, seed=0, min_batch=4096, stats=None, resolution=1):
+    """
+    Local moving phase of Louvain with the nodes of each color class of a
+    distance-1 coloring moved concurrently. Nodes of one class are never
+    adjacent, so they are evaluated against the same snapshot of the
+    communities, split across a process pool, and their moves applied
+    together. sigma_tot is reconciled after every class.
+
+    Sweeps stop when nothing moves or modularity improves by less than tol.
+    A sweep that lowers modularity, which can happen because nodes of one
+    class do not see each other's effect on sigma_tot, is undone.
+
+    Parameters
+    ----------
+    n_jobs: int
+        No. of worker processes, None or 1 evaluates the classes in this
+        process, -1 uses all the cores. Classes smaller than min_batch
+        are always evaluated in this process
+    seed: int
+        Seed for the coloring priorities
+
+    Returns the same (communities, sigma_in, sigma_tot) as
+    csr_modularity_optimisation.
+    """
+
+    n = len(k_i)
+    k_i = np.asarray(k_i, dtype=np.float64)
+    colors = _csr_coloring(indptr, indices, seed=seed)
+    order = np.argsort(colors, kind="stable")
+    classes = np.split(order, np.cumsum(np.bincount(colors))[:-1])
+
+    # Workers read the communities and sigma_tot through shared buffers
+    communities_buffer = RawArray("q", n)
+    sigma_buffer = RawArray("d", n)
+    shared_communities = np.frombuffer(communities_buffer, dtype=np.int64)
+    shared_sigma_tot = np.frombuffer(sigma_buffer, dtype=np.float64)
+    shared_communities[:] = communities
+    shared_sigma_tot[:] = np.bincount(communities, weights=k_i, minlength=n)
+
+    pool = None
+    if n_jobs is not None and n_jobs != 1 and max(len(nodes) for nodes in classes) >= min_batch:
+        if n_jobs < 0:
+            n_jobs = os.cpu_count()
+        pool = Pool(n_jobs, initializer=_init_moving_worker, initargs=(indptr, indices, weights, k_i, m, resolution, communities_buffer, sigma_buffer))
+
+    if stats is not None:
+        stats.trace("colors", len(classes))
+
+    try:
+        modularity = _csr_modularity(indptr, indices, weights, m, shared_communities, shared_sigma_tot, resolution)
+        while 1:
+            previous = shared_communities.copy()
+            moves = 0
+            for nodes in classes:
+                if pool is not None and len(nodes) >= min_batch:
+                    chunks = np.array_split(nodes, min(len(nodes), n_jobs * 4))
+                    results = pool.map(_worker_best_moves, chunks)
+                    moved = np.concatenate([r[0] for r in results])
+                    targets = np.concatenate([r[1] for r in results])
+                else:
+                    moved, targets = _csr_best_moves(indptr, indices, weights, k_i, m, shared_communities, shared_sigma_tot, nodes, resolution)
+
+                if len(moved):
+                    shared_sigma_tot -= np.bincount(shared_communities[moved], weights=k_i[moved], minlength=n)
+                    shared_sigma_tot += np.bincount(targets, weights=k_i[moved], minlength=n)
+                    shared_communities[moved] = targets
+                    moves += len(moved)
+
+            new_modularity = _csr_modularity(indptr, indices, weights, m, shared_communities, shared_sigma_tot, resolution)
+
+            if stats is not None:
+                stats.count("sweeps")
+                stats.count("moves", moves)
+                stats.trace("moves_per_sweep", moves)
+
+            if new_modularity < modularity:
+                shared_communities[:] = previous
+                shared_sigma_tot[:] = np.bincount(previous, weights=k_i, minlength=n)
+                break
+            if not moves or new_modularity - modularity < tol:
+                break
+            modularity = new_modularity
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    communities = shared_communities.copy()
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    internal = communities[rows] == communities[indices]
+    sigma_in = np.bincount(communities[rows[internal]], weights=weights[internal], minlength=n)
+
+    return communities, sigma_in, shared_sigma_tot.copy()
+
+
+def _init_moving_worker(indptr, indices, weights, k_i, m, resolution, communities_buffer, sigma_buffer):
+    global _worker_csr, _worker_k_i, _worker_m, _worker_resolution, _worker_communities, _worker_sigma_tot
+    _worker_csr = (indptr, indices, weights)
+    _worker_k_i = k_i
+    _worker_m = m
+    _worker_resolution = resolution
+    _worker_communities = np.frombuffer(communities_buffer, dtype=np.int64)
+    _worker_sigma_tot = np.frombuffer(sigma_buffer, dtype=np.float64)
+
+
+def _worker_best_moves(nodes):
+    return _csr_best_moves(*_worker_csr, _worker_k_i, _worker_m, _worker_communities, _worker_sigma_tot, nodes, _worker_resolution)
+
+
+def _csr_best_moves(indptr, indices, weights, k_i, m, communities, sigma_tot, nodes, resolution=1):
+    """
+    Best community of every node in nodes given the current communities,
+    with the gains of all (node, neighbor community) pairs computed at once.
+    Ties go to the community seen first in the row, as in
+    csr_modularity_optimisation. Returns the nodes that move and their
+    new communities.
+    """
+
+    n = len(k_i)
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    owner = np.repeat(np.arange(len(nodes)), lengths)
+    idx = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+
+    neighbors = indices[idx]
+    off_diagonal = neighbors != nodes[owner]
+    owner = owner[off_diagonal]
+    idx = idx[off_diagonal]
+
+    keys = owner * n + communities[neighbors[off_diagonal]]
+    unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    edge_weights = np.bincount(inverse, weights=weights[idx], minlength=len(unique_keys))
+    pair_owner = unique_keys // n
+    pair_community = unique_keys % n
+
+    k_node = k_i[nodes[pair_owner]]
+    own = communities[nodes[pair_owner]]
+    # sigma_tot of the node's own community without the node itself
+    sigma = sigma_tot[pair_community] - np.where(pair_community == own, k_node, 0)
+    gains = 2 * edge_weights - resolution * sigma * k_node / m
+
+    order = np.lexsort((first, -gains, pair_owner))
+    best = order[np.r_[True, pair_owner[order][1:] != pair_owner[order][:-1]]] if len(order) else order
+    moves = (gains[best] > 0) & (pair_community[best] != own[best])
+
+    return nodes[pair_owner[best[moves]]], pair_community[best[moves]]
+
+
+def _csr_coloring(indptr, indices, seed=0):
+    """
+    Distance-1 coloring by Jones-Plassmann rounds: each round colors the
+    uncolored nodes whose random priority beats all uncolored neighbors.
+    """
+
+    n = len(indptr) - 1
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    off_diagonal = rows != indices
+    rows, cols = rows[off_diagonal], np.asarray(indices[off_diagonal])
+    priority = np.random.default_rng(seed).permutation(n)
+
+    colors = np.full(n, -1, dtype=np.int64)
+    color = 0
+    while (colors < 0).any():
+        blocked = np.zeros(n, dtype=bool)
+        blocked[rows[priority[cols] > priority[rows]]] = True
+        selected = (colors < 0) & ~blocked
+        colors[selected] = color
+        color += 1
+
+        remaining = ~selected[rows] & ~selected[cols]
+        rows, cols = rows[remaining], cols[remaining]
+
+    return colors
+
+
+def _csr_modularity(indptr, indices, weights, m, communities, sigma_tot, resolution=1):
+
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    internal = communities[rows] == communities[indices]
+    return (np.sum(weights[internal]) - resolution * np.sum(sigma_tot ** 2) / (m*2)) / (m*2)
+
+
+def csr_community_aggregation(src, dst, weights, communities):
+    """
+    Collapses every community into a single node. Works on the one-entry-per-edge
+    arrays the CSR rows are built from, so communities are relabeled and coarse
+    edges ordered exactly as in community_aggregation.
+
+    The coarse graph is P^T A P for the membership matrix P, computed as a
+    single coo reduction: edges are keyed by their (ci, cj) pair and summed
+    with np.bincount in order of first appearance.
+    """
+
+    _, first, inverse = np.unique(communities, return_index=True, return_inverse=True)
+    communities = np.argsort(np.argsort(first))[inverse]
+    n = len(first)
+
+    keys = communities[src] * n + communities[dst]
+    unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    new_weights = np.bincount(rank[inverse], weights=weights, minlength=len(order))
+    new_src = unique_keys[order] // n
+    new_dst = unique_keys[order] % n
+
+    return new_src, new_dst, new_weights, communities
+
+
+def csr_louvains_method(indptr, indices, weights, stats=None, k_i=None, n_jobs=None, resolution=1, seed=None, as_partition=False, active_set=False):
+    """
+    Louvain method on a symmetric CSR graph. Returns the same
+    (partition, modularity) pair as louvains_method, with the nodes of each
+    community in ascending order. Levels, sweeps, moves and phase times are
+    recorded into stats (a cdet.instrumentation.Stats) when given. k_i, the
+    weighted degrees, is computed from the arrays unless given, e.g. by
+    cdet.edgelist.open_graph.
+
+    With n_jobs set (other than 1) every level uses
+    parallel_modularity_optimisation with that many worker processes.
+    Otherwise active_set=True uses the queue-based _csr_queue_local_moving,
+    which only revisits nodes whose neighborhood changed, instead of
+    sweeping over every node until none moves.
+
+    resolution is the gamma of the generalized modularity
+    Q = sum_c sigma_in_c / 2m - gamma * (sigma_tot_c / 2m)^2, which is what
+    is optimised and reported. Larger values give smaller communities.
+
+    With a seed, every level visits its nodes in a seeded random order
+    (and colors with that seed in parallel mode) instead of index order.
+
+    With as_partition the partition is returned as a cdet.partition.Partition,
+    which keeps the communities in one membership array instead of
+    building a list per community.
+    """
+
+    n = len(indptr) - 1
+    if k_i is None:
+        k_i = np.bincount(np.repeat(np.arange(n), np.diff(indptr)), weights=weights, minlength=n)
+    else:
+        k_i = np.asarray(k_i, dtype=np.float64)
+    m = k_i.sum() / 2
+    membership = np.arange(n)
+
+    if m == 0:
+        return _membership_to_partition(np.arange(n), as_partition), 0.0
+
+    src, dst, edge_weights = _csr_to_edge_arrays(indptr, indices, weights)
+    rng = np.random.default_rng(seed) if seed is not None else None
+
+    while 1:
+
+        if stats is not None:
+            stats.count("levels")
+            stats.trace("nodes_per_level", len(k_i))
+
+        with phase(stats, "local_moving"):
+            if n_jobs is not None and n_jobs != 1:
+                communities, sigma_in, sigma_tot = parallel_modularity_optimisation(indptr, indices, weights, k_i, m, np.arange(len(k_i)), n_jobs=n_jobs,
+                    seed=0 if rng is None else rng.integers(2**32), stats=stats, resolution=resolution)
+            elif active_set:
+                queue = rng.permutation(len(k_i)) if rng is not None else np.arange(len(k_i))
+                communities = _csr_queue_local_moving(indptr, indices, weights, k_i, m, np.arange(len(k_i)), queue, stats=stats, resolution=resolution)
+                rows = np.repeat(np.arange(len(k_i)), np.diff(indptr))
+                internal = communities[rows] == communities[indices]
+                sigma_in = np.bincount(communities[rows[internal]], weights=weights[internal], minlength=len(k_i))
+                sigma_tot = np.bincount(communities, weights=k_i, minlength=len(k_i))
+            else:
+                order = rng.permutation(len(k_i)).tolist() if rng is not None else None
+                communities, sigma_in, sigma_tot = csr_modularity_optimisation(indptr, indices, weights, k_i, m, np.arange(len(k_i)), stats=stats, resolution=resolution, order=order)
+        modularity = np.sum(sigma_in / (m*2) - resolution * (sigma_tot / (m*2)) ** 2)
+
+        if stats is not None:
+            stats.trace("modularity", float(modularity))
+
+        with phase(stats, "aggregation"):
+            src, dst, edge_weights, communities = csr_community_aggregation(src, dst, edge_weights, communities)
+            membership = communities[membership]
+            k_i = np.bincount(communities, weights=k_i)
+
+        if len(k_i) == len(communities):
+            break
+
+        with phase(stats, "csr_build"):
+            indptr, indices, weights = _edge_arrays_to_csr(len(k_i), src, dst, edge_weights)
+
+    return (_membership_to_partition(membership, as_partition), float(modularity))
+
+
+def csr_leiden_method(indptr, indices, weights, tol=1e-7, seed=0, n_iterations=2, stats=None, k_i=None, resolution=1, as_partition=False):
+    """
+    Leiden method on a symmetric CSR graph, returning (partition, modularity)
+    like csr_louvains_method.
+
+    Each level runs the queue-based local moving of _csr_queue_local_moving
+    from the communities of the previous level, in a seeded random order.
+    _csr_refine_partition then splits every community into well connected
+    subcommunities. The graph is aggregated by the refined partition with
+    csr_community_aggregation, and each aggregate node starts the next level
+    in the community of its parent. Levels stop when every community is a
+    single aggregate node or modularity improves by less than tol.
+
+    An iteration is one such run of levels. Every further iteration starts
+    again from the original graph with the communities found so far, and
+    iterations stop after n_iterations (-1 for no limit) or once one
+    improves modularity by less than tol. Finally communities are split
+    into their connected components, so every returned community is
+    connected. resolution and as_partition are as in csr_louvains_method.
+    """
+
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    n = len(indptr) - 1
+    if k_i is None:
+        k_i = np.bincount(np.repeat(np.arange(n), np.diff(indptr)), weights=weights, minlength=n)
+    else:
+        k_i = np.asarray(k_i, dtype=np.float64)
+    m = k_i.sum() / 2
+
+    if m == 0:
+        return _membership_to_partition(np.arange(n), as_partition), 0.0
+
+    rng = np.random.default_rng(seed)
+    membership = np.arange(n)
+    modularity = None
+    iteration = 0
+
+    while iteration != n_iterations:
+        membership, new_modularity = _csr_leiden_iteration(indptr, indices, weights, k_i, m, membership, rng, tol, stats, resolution)
+        iteration += 1
+        if stats is not None:
+            stats.count("iterations")
+        if modularity is not None and new_modularity - modularity < tol:
+            break
+        modularity = new_modularity
+
+    # Keep only the edges inside communities, whose components are then
+    # the connected pieces of every community
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    internal = membership[rows] == membership[indices]
+    _, membership = connected_components(csr_matrix((np.ones(internal.sum()), (rows[internal], indices[internal])), shape=(n, n)), directed=False)
+    membership = np.unique(membership, return_inverse=True)[1].ravel()
+    modularity = _csr_modularity(indptr, indices, weights, m, membership, np.bincount(membership, weights=k_i), resolution)
+
+    return (_membership_to_partition(membership, as_partition), float(modularity))
+
+
+def _csr_leiden_iteration(indptr, indices, weights, k_i, m, communities, rng, tol, stats, resolution=1):
+    """
+    One Leiden iteration from the given communities. Returns the community
+    of every node and the modularity.
+    """
+
+    src, dst, edge_weights = _csr_to_edge_arrays(indptr, indices, weights)
+    membership = np.arange(len(k_i))
+    modularity = None
+
+    while 1:
+
+        if stats is not None:
+            stats.count("levels")
+            stats.trace("nodes_per_level", len(k_i))
+
+        with phase(stats, "local_moving"):
+            communities = _csr_queue_local_moving(indptr, indices, weights, k_i, m, communities, rng.permutation(len(k_i)), stats=stats, resolution=resolution)
+        communities = np.unique(communities, return_inverse=True)[1].ravel()
+        new_modularity = _csr_modularity(indptr, indices, weights, m, communities, np.bincount(communities, weights=k_i), resolution)
+
+        if stats is not None:
+            stats.trace("modularity", float(new_modularity))
+
+        if communities.max() + 1 == len(k_i) or modularity is not None and new_modularity - modularity < tol:
+            return communities[membership], new_modularity
+        modularity = new_modularity
+
+        with phase(stats, "refinement"):
+            refined = _csr_refine_partition(indptr, indices, weights, k_i, m, communities, rng, resolution)
+
+        with phase(stats, "aggregation"):
+            src, dst, edge_weights, refined = csr_community_aggregation(src, dst, edge_weights, refined)
+            membership = refined[membership]
+            parent = np.empty(refined.max() + 1, dtype=np.int64)
+            parent[refined] = communities
+            communities = parent
+            k_i = np.bincount(refined, weights=k_i)
+
+        if stats is not None:
+            stats.trace("refined_communities", len(k_i))
+
+        with phase(stats, "csr_build"):
+            indptr, indices, weights = _edge_arrays_to_csr(len(k_i), src, dst, edge_weights)
+
+
+def _csr_refine_partition(indptr, indices, weights, k_i, m, communities, rng, resolution=1):
+    """
+    Refinement phase of Leiden. Every node starts as a singleton. Visited in
+    random order, a node that is still a singleton and well connected to its
+    community joins the well connected subcommunity of the same community
+    with the largest modularity gain, if that gain is positive. A set S in
+    community P is well connected when
+    w(S, P - S) >= resolution * k_S * (k_P - k_S) / (2m).
+    """
+
+    n = len(k_i)
+    communities = communities.tolist()
+    k = k_i.tolist()
+    community_tot = np.bincount(communities, weights=k_i).tolist()
+    row_start = indptr.tolist()
+    neighbors = indices.tolist()
+    edge_weight = weights.tolist()
+
+    refined = list(range(n))
+    refined_tot = list(k)
+    refined_size = [1] * n
+    # w(S, P - S) of every refined community S, starting from the singletons
+    external = [0] * n
+    for node in range(n):
+        for idx in range(row_start[node], row_start[node + 1]):
+            neighbor = neighbors[idx]
+            if neighbor != node and communities[neighbor] == communities[node]:
+                external[node] += edge_weight[idx]
+
+    for node in rng.permutation(n).tolist():
+        if refined_size[refined[node]] > 1:
+            continue
+        comm = communities[node]
+        k_node = k[node]
+        total = community_tot[comm]
+        if external[node] < resolution * k_node * (total - k_node) / (2*m):
+            continue
+
+        neighbor_weights = {}
+        for idx in range(row_start[node], row_start[node + 1]):
+            neighbor = neighbors[idx]
+            if neighbor == node or communities[neighbor] != comm:
+                continue
+            community = refined[neighbor]
+            neighbor_weights[community] = neighbor_weights.get(community, 0) + edge_weight[idx]
+
+        best_community = refined[node]
+        best_gain = 0
+        for community, edge_weights in neighbor_weights.items():
+            tot = refined_tot[community]
+            if external[community] < resolution * tot * (total - tot) / (2*m):
+                continue
+            delta_modularity = 2 * edge_weights - resolution * tot * k_node / m
+            if delta_modularity > best_gain:
+                best_community = community
+                best_gain = delta_modularity
+
+        if best_community != refined[node]:
+            external[best_community] += external[node] - 2 * neighbor_weights[best_community]
+            refined_tot[best_community] += k_node
+            refined_size[best_community] += 1
+            refined_tot[node] = 0
+            refined_size[node] = 0
+            refined[node] = best_community
+
+    return np.array(refined, dtype=np.int64)
+
+
+def csr_louvains_update(indptr, indices, weights, partition, insertions=(), deletions=(), stats=None, resolution=1, as_partition=False):
+    """
+    Warm-started Louvain for an evolving graph. Applies a batch of edge
+    insertions ((u, v) or (u, v, w)) and deletions ((u, v)) to the CSR graph,
+    re-optimises only the changed nodes and their neighborhoods starting from
+    the previous partition, then runs Louvain on the graph aggregated by the
+    refreshed communities. Nodes beyond the current graph are added as
+    singletons and deleting an absent edge has no effect.
+
+    partition can be a List[List[int]] or a Partition, and as_partition is
+    as in csr_louvains_method. Returns ((indptr, indices, weights),
+    (partition, modularity)) so the updated graph can be passed to the
+    next refresh.
+    """
+
+    insertions = [tuple(e) for e in insertions]
+    deletions = [tuple(e[:2]) for e in deletions]
+    ins_src = np.array([e[0] for e in insertions], dtype=np.int64)
+    ins_dst = np.array([e[1] for e in insertions], dtype=np.int64)
+    ins_weights = np.array([e[2] if len(e) > 2 else 1 for e in insertions], dtype=np.float64)
+
+    old_n = len(indptr) - 1
+    n = max([old_n] + [node + 1 for e in insertions for node in e[:2]])
+
+    membership = np.full(n, -1, dtype=np.int64)
+    if isinstance(partition, Partition):
+        membership[:partition.num_nodes] = partition.membership
+    else:
+        for i, part in enumerate(partition):
+            membership[part] = i
+    new_nodes = np.flatnonzero(membership < 0)
+    membership[new_nodes] = len(partition) + np.arange(len(new_nodes))
+
+    rows = np.repeat(np.arange(old_n), np.diff(indptr))
+    k_i = np.bincount(rows, weights=weights, minlength=n)
+
+    keep = np.ones(len(indices), dtype=bool)
+    for u, v in deletions:
+        for a, b in ((u, v), (v, u)):
+            if a < old_n:
+                start = indptr[a]
+                keep[start + np.flatnonzero(indices[start:indptr[a + 1]] == b)] = False
+
+    loops = ins_src == ins_dst
+    ins_rows = np.concatenate((ins_src, ins_dst[~loops]))
+    ins_cols = np.concatenate((ins_dst, ins_src[~loops]))
+    ins_weights = np.concatenate((np.where(loops, 2, 1) * ins_weights, ins_weights[~loops]))
+
+    k_i -= np.bincount(rows[~keep], weights=weights[~keep], minlength=n)
+    k_i += np.bincount(ins_rows, weights=ins_weights, minlength=n)
+    m = k_i.sum() / 2
+
+    indptr, indices, weights = _csr_merge(n, rows[keep], indices[keep], weights[keep], ins_rows, ins_cols, ins_weights)
+
+    changed = np.unique(np.concatenate((ins_rows, [node for e in deletions for node in e if node < n])).astype(np.int64))
+    affected = np.concatenate([changed] + [indices[indptr[node]:indptr[node + 1]] for node in changed])
+    with phase(stats, "warm_start"):
+        membership = _csr_queue_local_moving(indptr, indices, weights, k_i, m, membership, affected, stats=stats, resolution=resolution)
+
+    with phase(stats, "aggregation"):
+        src, dst, edge_weights = _csr_to_edge_arrays(indptr, indices, weights)
+        src, dst, edge_weights, membership = csr_community_aggregation(src, dst, edge_weights, membership)
+    coarse_partition, modularity = csr_louvains_method(*_edge_arrays_to_csr(membership.max() + 1, src, dst, edge_weights), stats=stats, resolution=resolution, as_partition=True)
+
+    return (indptr, indices, weights), (_membership_to_partition(coarse_partition.membership[membership], as_partition), modularity)
+
+
+def resolution_sweep(indptr, indices, weights, resolutions, method="louvain", n_jobs=None, cache_dir=None, k_i=None, as_partition=False, **kwargs):
+    """
+    Runs csr_louvains_method, or csr_leiden_method with method="leiden", at
+    every resolution in resolutions. The degree vector and the arrays are
+    prepared once and shared by all runs, which are spread over a process
+    pool with n_jobs (None or 1 runs serially, -1 uses all the cores).
+
+    Results are cached by graph_fingerprint, method, resolution, kwargs
+    and k_i if given: in memory for the RESOLUTION_CACHE_SIZE most recently
+    used results, and as .npz files in cache_dir if given, so repeated
+    sweeps of the same graph only run the resolutions not seen before.
+
+    Returns
+    -------
+    results: Dict[float, Tuple[List[List[int]], float]]
+        (partition, modularity) for every resolution, modularity being the
+        generalized modularity at that resolution. Partitions are
+        cdet.partition.Partition objects with as_partition
+    """
+
+    if method not in ("louvain", "leiden"):
+        raise ValueError("Method can be 'louvain' or 'leiden'.")
+
+    n = len(indptr) - 1
+    fingerprint = graph_fingerprint(indptr, indices, weights)
+    options = hashlib.blake2b(repr(sorted(kwargs.items())).encode(), digest_size=4)
+    if k_i is None:
+        k_i = np.bincount(np.repeat(np.arange(n), np.diff(indptr)), weights=weights, minlength=n)
+    else:
+        # Degrees other than the row sums change the result
+        options.update(np.ascontiguousarray(k_i, dtype=np.float64).tobytes())
+    options = options.hexdigest()
+
+    results = {}
+    todo = []
+    for resolution in dict.fromkeys(float(r) for r in resolutions):
+        key = "{}-{}-{!r}-{}".format(fingerprint, method, resolution, options)
+        if key not in _resolution_cache and cache_dir is not None:
+            path = os.path.join(cache_dir, key + ".npz")
+            if os.path.exists(path):
+                with np.load(path) as cached:
+                    _remember_resolution(key, (cached["membership"], float(cached["modularity"])))
+        if key in _resolution_cache:
+            _resolution_cache.move_to_end(key)
+            results[resolution] = _resolution_cache[key]
+        else:
+            todo.append((key, resolution))
+
+    computed = _run_csr_methods(indptr, indices, weights, k_i, method, kwargs, [{"resolution": resolution} for _, resolution in todo], n_jobs)
+
+    for (key, resolution), result in zip(todo, computed):
+        results[resolution] = result
+        _remember_resolution(key, result)
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.savez(os.path.join(cache_dir, key + ".npz"), membership=result[0], modularity=result[1])
+
+    return {resolution: (_membership_to_partition(membership, as_partition), modularity)
+        for resolution, (membership, modularity) in sorted(results.items())}
+
+
+# In-memory tier of the resolution_sweep cache, least recently used first
+RESOLUTION_CACHE_SIZE = 32
+_resolution_cache = OrderedDict()
+
+
+def _remember_resolution(key, result):
+
+    _resolution_cache[key] = result
+    _resolution_cache.move_to_end(key)
+    while len(_resolution_cache) > RESOLUTION_CACHE_SIZE:
+        _resolution_cache.popitem(last=False)
+
+
+def multi_start_louvain(indptr, indices, weights, n_starts=8, seed=0, method="louvain", n_jobs=None, k_i=None, as_partition=False, **kwargs):
+    """
+    Runs n_starts independent restarts of csr_louvains_method (or
+    csr_leiden_method with method="leiden"), each with its own seeded
+    random node order, and keeps the one with the highest modularity. The
+    graph is prepared once and shared by all restarts, which are spread
+    over a process pool with n_jobs (None or 1 runs serially, -1 uses all
+    the cores). kwargs are passed to every run, e.g. resolution.
+
+    Returns
+    -------
+    best: Tuple[List[List[int]], float]
+        (partition, modularity) of the best restart, a
+        cdet.partition.Partition with as_partition
+    consensus: Dict
+        "seeds", "modularity" and "num_communities" of every restart,
+        "ari_to_best", the adjusted Rand index of every restart against
+        the best one, and "edge_coassignment", the fraction of restarts
+        that put both endpoints of each CSR entry in the same community,
+        aligned with indices
+    """
+
+    if method not in ("louvain", "leiden"):
+        raise ValueError("Method can be 'louvain' or 'leiden'.")
+
+    n = len(indptr) - 1
+    if k_i is None:
+        k_i = np.bincount(np.repeat(np.arange(n), np.diff(indptr)), weights=weights, minlength=n)
+    seeds = np.random.SeedSequence(seed).generate_state(n_starts).tolist()
+
+    results = _run_csr_methods(indptr, indices, weights, k_i, method, kwargs, [{"seed": s} for s in seeds], n_jobs)
+    modularities = [modularity for _, modularity in results]
+    best = int(np.argmax(modularities))
+    best_membership = results[best][0]
+
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    coassignment = np.zeros(len(indices))
+    for membership, _ in results:
+        coassignment += membership[rows] == membership[indices]
+
+    consensus = {
+        "seeds": seeds,
+        "modularity": modularities,
+        "num_communities": [int(membership.max()) + 1 for membership, _ in results],
+        "ari_to_best": [_adjusted_rand_index(best_membership, membership) for membership, _ in results],
+        "edge_coassignment": coassignment / len(results),
+    }
+
+    return (_membership_to_partition(best_membership, as_partition), modularities[best]), consensus
+
+
+def _run_csr_methods(indptr, indices, weights, k_i, method, kwargs, runs, n_jobs):
+    """
+    Runs the CSR method once per dict of extra arguments in runs, in a
+    process pool whose workers receive the graph once. Returns the
+    (membership, modularity) of every run.
+    """
+
+    if n_jobs is not None and n_jobs != 1 and len(runs) > 1:
+        if n_jobs < 0:
+            n_jobs = os.cpu_count()
+        with Pool(min(n_jobs, len(runs)), initializer=_init_run_worker, initargs=(indptr, indices, weights, k_i, method, kwargs)) as pool:
+            return pool.map(_run_worker, runs)
+    # Serially the graph is passed along, the worker globals only ever
+    # live in pool processes
+    return [_run_csr_method((indptr, indices, weights), k_i, method, dict(kwargs, **run)) for run in runs]
+
+
+def _run_csr_method(csr, k_i, method, kwargs):
+
+    run_method = csr_leiden_method if method == "leiden" else csr_louvains_method
+    partition, modularity = run_method(*csr, k_i=k_i, as_partition=True, **kwargs)
+    return partition.membership, modularity
+
+
+def _init_run_worker(indptr, indices, weights, k_i, method, kwargs):
+    global _run_csr, _run_k_i, _run_method, _run_kwargs
+    _run_csr = (indptr, indices, weights)
+    _run_k_i = k_i
+    _run_method = method
+    _run_kwargs = kwargs
+
+
+def _run_worker(run):
+    return _run_csr_method(_run_csr, _run_k_i, _run_method, dict(_run_kwargs, **run))
+
+
+def _adjusted_rand_index(a, b):
+
+    if len(a) < 2:
+        return 1.0
+    _, a = np.unique(a, return_inverse=True)
+    _, b = np.unique(b, return_inverse=True)
+    pairs = lambda x: np.sum(x * (x - 1)) / 2
+    contingency = np.unique(a.ravel() * (b.max() + 1) + b.ravel(), return_counts=True)[1]
+    sum_ab = pairs(contingency)
+    sum_a = pairs(np.bincount(a.ravel()))
+    sum_b = pairs(np.bincount(b.ravel()))
+    expected = sum_a * sum_b / pairs(np.array([len(a)]))
+    maximum = (sum_a + sum_b) / 2
+    if maximum == expected:
+        return 1.0
+    return float((sum_ab - expected) / (maximum - expected))
+
+
+def graph_fingerprint(indptr, indices, weights):
+    """
+    Content hash of symmetric CSR arrays, the same in every process and run
+    for equal graphs. The arrays are hashed in blocks, so memory mapped
+    inputs are not copied whole.
+    """
+
+    h = hashlib.blake2b(digest_size=16)
+    for array, dtype in ((indptr, np.int64), (indices, np.int64), (weights, np.float64)):
+        h.update(str(len(array)).encode())
+        for start in range(0, len(array), 1 << 22):
+            h.update(np.ascontiguousarray(array[start:start + (1 << 22)], dtype=dtype).tobytes())
+    return h.hexdigest()
+
+
+def _csr_merge(n, rows, cols, weights, ins_rows, ins_cols, ins_weights):
+    """
+    Builds CSR arrays from row-sorted entries plus a batch of unsorted
+    insertions, which are appended to the end of their rows.
+    """
+
+    kept_counts = np.bincount(rows, minlength=n)
+    ins_counts = np.bincount(ins_rows, minlength=n)
+    ins_before = np.cumsum(ins_counts) - ins_counts
+    kept_end = np.cumsum(kept_counts)
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(kept_counts + ins_counts, out=indptr[1:])
+    indices = np.empty(indptr[-1], dtype=np.int64)
+    new_weights = np.empty(indptr[-1], dtype=np.float64)
+
+    position = np.arange(len(rows)) + ins_before[rows]
+    indices[position] = cols
+    new_weights[position] = weights
+
+    order = np.argsort(ins_rows, kind="stable")
+    position = kept_end[ins_rows[order]] + np.arange(len(order))
+    indices[position] = ins_cols[order]
+    new_weights[position] = ins_weights[order]
+
+    return indptr, indices, new_weights
+
+
+def _csr_queue_local_moving(indptr, indices, weights, k_i, m, communities, queue, stats=None, resolution=1):
+    """
+    Local moving that only visits queued nodes. A node that changes
+    community queues its neighbors that are outside its new community.
+    m can also be an array with the total weight of the graph of every
+    node, for disjoint graphs packed into one.
+    """
+
+    n = len(k_i)
+    sigma_tot = np.bincount(communities, weights=k_i, minlength=n).tolist()
+    communities = communities.tolist()
+    k = k_i.tolist()
+    total_weight = np.broadcast_to(np.asarray(m, dtype=np.float64), (n,)).tolist()
+    row_start = indptr.tolist()
+    neighbors = indices.tolist()
+    edge_weight = weights.tolist()
+
+    queue = deque(dict.fromkeys(np.asarray(queue).tolist()))
+    queued = [False] * n
+    for node in queue:
+        queued[node] = True
+
+    visits = moves = 0
+    while queue:
+        node = queue.popleft()
+        queued[node] = False
+        visits += 1
+        comm = communities[node]
+        k_node = k[node]
+        m_node = total_weight[node]
+
+        neighbor_weights = {}
+        for idx in range(row_start[node], row_start[node + 1]):
+            neighbor = neighbors[idx]
+            if neighbor == node:
+                continue
+            community = communities[neighbor]
+            neighbor_weights[community] = neighbor_weights.get(community, 0) + edge_weight[idx]
+
+        sigma_tot[comm] -= k_node
+        best_community = comm
+        best_gain = 0
+        # As in csr_modularity_optimisation
+        if comm in neighbor_weights:
+            best_gain = max(0, 2 * neighbor_weights[comm] - resolution * sigma_tot[comm] * k_node / m_node)
+
+        for community, edge_weights in neighbor_weights.items():
+            delta_modularity = 2 * edge_weights - resolution * sigma_tot[community] * k_node / m_node
+            if delta_modularity > best_gain + 1e-10 * k_node:
+                best_community = community
+                best_gain = delta_modularity
+
+        communities[node] = best_community
+        sigma_tot[best_community] += k_node
+
+        if comm != best_community:
+            moves += 1
+            for idx in range(row_start[node], row_start[node + 1]):
+                neighbor = neighbors[idx]
+                if not queued[neighbor] and communities[neighbor] != best_community:
+                    queued[neighbor] = True
+                    queue.append(neighbor)
+
+    if stats is not None:
+        stats.count("queue_visits", visits)
+        stats.count("moves", moves)
+
+    return np.array(communities, dtype=np.int64)
+
+
+def _membership_to_partition(membership, as_partition=False):
+
+    partition = Partition(membership)
+    return partition if as_partition else partition.to_list()
+
+
 def zachary():
     
     G = nx.karate_club_graph()
@@ -271,25 +1311,30 @@ def visualize_graph(G, pos, labels_dict=None, colors=None, node_size=100, edge_a
 
 
 
+def main():
+    import matplotlib.pyplot as plt
 
-result = plantedl()
-G = result[0]
-final_partition = result[1][0]
-final_modularity = result[1][1]
-
-pos = nx.spring_layout(G)
-
-labels_dict = {i: final_partition[i] for i in range(len(final_partition))}
+    result = plantedl()
+    G = result[0]
+    final_partition = result[1][0]
+    final_modularity = result[1][1]
 
-COLORS =     ["tab:blue", "tab:orange", "tab:green", 
-     "tab:red", "tab:purple", "tab:brown", 
-     "tab:pink", "tab:gray", "tab:olive", 
-     "tab:cyan"]
+    pos = nx.spring_layout(G)
 
+    labels_dict = {i: final_partition[i] for i in range(len(final_partition))}
 
+    COLORS = \
+        ["tab:blue", "tab:orange", "tab:green", 
+         "tab:red", "tab:purple", "tab:brown", 
+         "tab:pink", "tab:gray", "tab:olive", 
+         "tab:cyan"]
 
+    visualize_graph(G, pos, labels_dict=None, colors=COLORS, node_size=10)
+    plt.show()
 
-visualize_graph(G, pos, labels_dict=None, colors=COLORS, node_size=10)
+    visualize_graph(G, pos, labels_dict=labels_dict, colors=COLORS, node_size=10)
+    plt.show()
 
-visualize_graph(G, pos, labels_dict=labels_dict, colors=COLORS, node_size=10)
 
+if __name__ == "__main__":
+    main()
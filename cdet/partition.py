@@ -0,0 +1,173 @@
+"""
+Compact results of community detection.
+
+A Partition holds the community of every node in a single int32 array,
+plus the original node ids if they are not 0..n-1, instead of one Python
+list per community:
+
+    partition, modularity = csr_louvains_method(indptr, indices, weights, as_partition=True)
+    partition = partition.with_node_ids(node_ids)
+    partition.membership            # community of every node
+    partition[3]                    # original ids of the nodes in community 3
+    columns = partition.to_columns()  # {"node": ..., "community": ...}
+
+The nodes of every community are found with one stable argsort on first
+access, and community c is then a slice of that order. to_list and to_dict
+give the List[List] and Dict[int, List] results of the other functions.
+"""
+
+import numpy as np
+
+
+class Partition:
+    """
+    Assignment of nodes 0..n-1 to communities 0..k-1.
+
+    Parameters
+    ----------
+    membership: 1D array-like of int
+        Community of every node
+    node_ids: 1D array-like
+        Original id of every node, None if the nodes are 0..n-1
+    num_communities: int
+        No. of communities, by default one more than the largest label.
+        Larger values add empty communities
+    """
+
+    def __init__(self, membership, node_ids=None, num_communities=None):
+        membership = np.asarray(membership).ravel()
+        if num_communities is None:
+            num_communities = int(membership.max()) + 1 if len(membership) else 0
+        dtype = np.int32 if num_communities <= np.iinfo(np.int32).max else np.int64
+        self.membership = membership.astype(dtype, copy=False)
+        self.num_communities = num_communities
+        self.node_ids = None if node_ids is None else _id_array(node_ids)
+        if self.node_ids is not None and len(self.node_ids) != len(self.membership):
+            raise ValueError("Got {} node ids for {} nodes.".format(len(self.node_ids), len(self.membership)))
+        self._order = None
+        self._bounds = None
+
+    @classmethod
+    def from_communities(cls, communities, node_ids=None):
+        """
+        Partition of the nodes 0..n-1 from a list of node lists covering
+        each of them once, e.g. the partition of louvains_method.
+        """
+
+        sizes = [len(part) for part in communities]
+        nodes = np.fromiter((node for part in communities for node in part), dtype=np.int64, count=sum(sizes))
+        membership = np.empty(len(nodes), dtype=np.int64)
+        membership[nodes] = np.repeat(np.arange(len(sizes)), sizes)
+        return cls(membership, node_ids=node_ids, num_communities=len(sizes))
+
+    def with_node_ids(self, node_ids):
+        """
+        The same partition labeled with node_ids, e.g. those returned by
+        cdet.edgelist.read_edgelist. The membership array is shared.
+        """
+
+        partition = Partition(self.membership, node_ids=node_ids, num_communities=self.num_communities)
+        partition._order, partition._bounds = self._order, self._bounds
+        return partition
+
+    @property
+    def num_nodes(self):
+        return len(self.membership)
+
+    def __len__(self):
+        return self.num_communities
+
+    def __getitem__(self, community):
+        members = self.members(community)
+        return members if self.node_ids is None else self.node_ids[members]
+
+    def __iter__(self):
+        for community in range(self.num_communities):
+            yield self[community]
+
+    def __repr__(self):
+        return "Partition(num_nodes={}, num_communities={})".format(self.num_nodes, self.num_communities)
+
+    def sizes(self):
+        """
+        No. of nodes in every community.
+        """
+
+        return np.bincount(self.membership, minlength=self.num_communities)
+
+    def members(self, community):
+        """
+        Nodes (0..n-1) of a community in increasing order, as a read-only
+        view into the sorted node order.
+        """
+
+        order, bounds = self._index()
+        return order[bounds[community]:bounds[community + 1]]
+
+    def _index(self):
+
+        if self._order is None:
+            order = np.argsort(self.membership, kind="stable")
+            order.flags.writeable = False
+            bounds = np.zeros(self.num_communities + 1, dtype=np.int64)
+            np.cumsum(self.sizes(), out=bounds[1:])
+            self._order, self._bounds = order, bounds
+        return self._order, self._bounds
+
+    def to_list(self):
+        """
+        List[List] of the node ids of every community.
+        """
+
+        order, bounds = self._index()
+        nodes = (order if self.node_ids is None else self.node_ids[order]).tolist()
+        bounds = bounds.tolist()
+        return [nodes[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def to_dict(self):
+        """
+        Dict[int, List] from community number to node ids, as returned by
+        spectral_clustering.
+        """
+
+        return dict(enumerate(self.to_list()))
+
+    def to_columns(self):
+        """
+        Dict of the "node" and "community" columns, one row per node, which
+        pandas.DataFrame and pyarrow.table accept as they are.
+        """
+
+        nodes = np.arange(self.num_nodes) if self.node_ids is None else self.node_ids
+        return {"node": nodes, "community": self.membership}
+
+    def to_arrow(self):
+        """
+        The columns of to_columns as a pyarrow.Table. Needs pyarrow.
+        """
+
+        import pyarrow as pa
+
+        return pa.table(self.to_columns())
+
+    def to_parquet(self, path, **kwargs):
+        """
+        Writes the columns of to_columns to a Parquet file. kwargs are
+        passed to pyarrow.parquet.write_table. Needs pyarrow.
+        """
+
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path, **kwargs)
+
+
+def _id_array(node_ids):
+
+    if isinstance(node_ids, np.ndarray) and node_ids.ndim == 1:
+        return node_ids
+    node_ids = list(node_ids)
+    ids = np.asarray(node_ids)
+    # Tuples would become rows and mixed types would all become strings
+    if ids.ndim != 1 or ids.dtype.kind == "U" and not all(isinstance(v, str) for v in node_ids):
+        ids = np.fromiter(node_ids, dtype=object, count=len(node_ids))
+    return ids
@@ -1,8 +1,12 @@
+import os
+from collections import OrderedDict
+
 import numpy as np
 import scipy.sparse as sp
 import networkx as nx
-import matplotlib.pyplot as plt
-from sklearn.cluster import KMeans
+
+from cdet.louvains import graph_fingerprint
+from cdet.partition import Partition
 
 def normalize_eigenvectors(e):
 	"""
@@ -21,14 +25,37 @@ def normalize_eigenvectors(e):
 	return e/np.sqrt(np.sum(e**2))
 
 
+def adjacency_matrix(G):
+	"""
+	Weighted adjacency matrix of G as a sp.csr_matrix
+
+	Parameters
+	----------
+	G: nx.graph, scipy sparse matrix or (indptr, indices, weights)
+		A graph, its adjacency matrix, or the symmetric CSR arrays of
+		cdet.edgelist.read_edgelist / edges_to_csr. Those store twice the
+		self-loop weight on the diagonal, which is halved here to match
+		nx.adjacency_matrix
+	"""
+
+	if isinstance(G, tuple):
+		indptr, indices, weights = G
+		n = len(indptr) - 1
+		rows = np.repeat(np.arange(n), np.diff(indptr))
+		return sp.csr_matrix((np.where(rows == indices, 0.5, 1) * weights, indices, indptr), shape=(n, n), dtype=np.float64)
+	if sp.issparse(G):
+		return sp.csr_matrix(G, dtype=np.float64)
+	return sp.csr_matrix(nx.adjacency_matrix(G), dtype=np.float64)
+
+
 def laplacian(G, laplacian_type="unnormalized"):
 	"""
 	Create the Laplacian from a graph
 
 	Parameters
 	----------
-	G: nx.graph
-		The graph for which to construct the Laplacian for
+	G: nx.graph, scipy sparse matrix or (indptr, indices, weights)
+		The graph for which to construct the Laplacian for, see adjacency_matrix
 	laplacian_type: Type of laplacian
 		"unnormalized": L = D - W
 		"symmetric": L = I - D^{-1/2}*W*D^{-1/2}
@@ -36,33 +63,527 @@ def laplacian(G, laplacian_type="unnormalized"):
 
 	Returns
 	-------
-	L: np.array
-		The laplacian of G
+	L: sp.csr_matrix
+		The laplacian of G. D is never formed as a dense matrix, the
+		normalized variants scale the rows (and columns) of W by the
+		inverse degrees directly. Isolated nodes get a zero scale.
 	"""
 
-	D = np.diag(np.sum(np.array(nx.adjacency_matrix(G).todense()), axis=1))
-	W = nx.adjacency_matrix(G).toarray()
-
-	assert D.shape == W.shape, "Shapes of D and W don't match."
+	W = adjacency_matrix(G)
+	degrees = np.asarray(W.sum(axis=1)).ravel()
+	I = sp.identity(W.shape[0], format="csr")
 
 	L = None
 
 	if laplacian_type == "unnormalized":
-		L = D - W
+		L = sp.diags(degrees) - W
 	elif laplacian_type == "symmetric":
-		I = np.ones(D.shape)
-		D_inv_root = np.linalg.inv(np.sqrt(D))
+		d_inv_root = np.zeros_like(degrees)
+		np.divide(1, np.sqrt(degrees), out=d_inv_root, where=degrees > 0)
+		D_inv_root = sp.diags(d_inv_root)
 
-		L = I - np.dot(D_inv_root, W).dot(D_inv_root)
+		L = I - D_inv_root @ W @ D_inv_root
 	elif laplacian_type == "random_walk":
-		I = np.ones(D.shape)
-		D_inv = np.linalg.matrix_power(D, -1)
+		d_inv = np.zeros_like(degrees)
+		np.divide(1, degrees, out=d_inv, where=degrees > 0)
+
+		L = I - sp.diags(d_inv) @ W
+	else:
+		raise ValueError("Laplacian type can be 'unnormalized', 'symmetric' or 'random_walk'.")
+
+	return sp.csr_matrix(L)
+
+def smallest_eigenvectors(L, k, solver="eigsh", tol=None, maxiter=None, sigma=None, preconditioner=None, random_state=0):
+	"""
+	Computes the k eigenvectors of a symmetric Laplacian with the smallest
+	eigenvalues.
+
+	Parameters
+	----------
+	L: sp.csr_matrix
+		Symmetric Laplacian ("unnormalized" or "symmetric")
+	k: int
+		No. of eigenvectors
+	solver: str
+		"eigsh": ARPACK Lanczos, with which="SM" or shift-invert
+			around sigma if sigma is given
+		"lobpcg": LOBPCG started from a seeded random block
+	tol: float
+		Convergence tolerance, None uses the solver default
+	maxiter: int
+		Iteration cap, None uses the solver default
+	sigma: float
+		Shift for eigsh shift-invert mode. Use a small negative value,
+		the Laplacian itself is singular
+	preconditioner: str or scipy LinearOperator
+		Preconditioner for LOBPCG. "amg" builds a smoothed aggregation
+		multigrid preconditioner with pyamg
+	random_state: int
+		Seed for the LOBPCG starting block
+
+	Returns
+	-------
+	eig_values: 1D np.array
+		Eigenvalues in ascending order
+	eig_vectors: 2D np.array
+		Matching eigenvectors as columns
+	"""
+
+	if solver == "eigsh":
+		if sigma is None:
+			eig_values, eig_vectors = sp.linalg.eigsh(L, k, which="SM", tol=0 if tol is None else tol, maxiter=maxiter)
+		else:
+			eig_values, eig_vectors = sp.linalg.eigsh(L, k, sigma=sigma, which="LM", tol=0 if tol is None else tol, maxiter=maxiter)
+	elif solver == "lobpcg":
+		if preconditioner == "amg":
+			try:
+				import pyamg
+			except ImportError:
+				raise ImportError("The 'amg' preconditioner requires pyamg.")
+			# Small shift so the multigrid hierarchy is built on a nonsingular matrix
+			shifted = L + 1e-5 * sp.identity(L.shape[0], format="csr")
+			preconditioner = pyamg.smoothed_aggregation_solver(shifted).aspreconditioner()
+
+		X = np.random.default_rng(random_state).standard_normal((L.shape[0], k))
+		eig_values, eig_vectors = sp.linalg.lobpcg(L, X, M=preconditioner, tol=tol, maxiter=maxiter, largest=False)
+	else:
+		raise ValueError("Solver can be 'eigsh' or 'lobpcg'.")
+
+	order = np.argsort(eig_values)
+
+	return eig_values[order], eig_vectors[:, order]
+
+
+class EmbeddingCache:
+	"""
+	Cache of Laplacian eigenvectors, keyed by a content hash of the
+	adjacency matrix, the Laplacian type and the solver with the settings
+	that decide its accuracy, so approximate eigenvectors are never
+	returned for a more exact request. Only the largest eigenvector count
+	computed for a key is kept, and a request for k vectors is answered
+	from any entry with at least k.
 
-		L = I - np.matmul(D_inv, W)
+	Entries live in an in-memory LRU tier and, with cache_dir, in an on-disk
+	tier of .npy files. Files of the least recently used entries are
+	deleted once the directory grows past max_bytes.
+
+	Parameters
+	----------
+	max_entries: int
+		No. of embeddings kept in memory
+	cache_dir: str
+		Directory of the on-disk tier, None keeps the cache in memory only
+	max_bytes: int
+		Size limit of the on-disk tier
+	"""
+
+	def __init__(self, max_entries=8, cache_dir=None, max_bytes=1 << 30):
+		self.max_entries = max_entries
+		self.cache_dir = cache_dir
+		self.max_bytes = max_bytes
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def key(self, G, laplacian_type, solver="eigsh", tol=None, maxiter=None, **options):
+		"""
+		Key of the eigenvectors of G computed by solver with tol, maxiter
+		and any other options that change the result, e.g. sigma of eigsh,
+		the preconditioner and random_state of LOBPCG or n_iter of the
+		randomized solver.
+		"""
+
+		settings = "-".join([laplacian_type, solver, "tol{}".format(tol), "maxiter{}".format(maxiter)]
+			+ ["{}{}".format(name, options[name]) for name in sorted(options)])
+		# CSR arrays are hashed as they are, memory mapped ones block by block
+		if isinstance(G, tuple):
+			return "csr{}-{}".format(graph_fingerprint(*G), settings)
+		W = adjacency_matrix(G)
+		W.sum_duplicates()
+		W.sort_indices()
+		return "{}-{}".format(graph_fingerprint(W.indptr, W.indices, W.data), settings)
+
+	def get(self, key, k):
+		"""
+		(eig_values, eig_vectors) of the k smallest eigenvalues, or None.
+		"""
+
+		entry = self.entries.get(key)
+		if entry is None and self.cache_dir is not None:
+			paths = self._paths(key)
+			if all(os.path.exists(path) for path in paths):
+				entry = (np.load(paths[0]), np.load(paths[1], mmap_mode="r"))
+				for path in paths:
+					os.utime(path)
+				self._remember(key, entry)
+
+		if entry is None or len(entry[0]) < k:
+			self.misses += 1
+			return None
+
+		self.hits += 1
+		self.entries.move_to_end(key)
+		return entry[0][:k], np.asarray(entry[1][:, :k])
+
+	def put(self, key, eig_values, eig_vectors):
+
+		entry = self.entries.get(key)
+		if entry is not None and len(entry[0]) >= len(eig_values):
+			return
+		self._remember(key, (eig_values, eig_vectors))
+
+		if self.cache_dir is not None:
+			os.makedirs(self.cache_dir, exist_ok=True)
+			values_path, vectors_path = self._paths(key)
+			np.save(values_path, eig_values)
+			np.save(vectors_path, eig_vectors)
+			self._evict_files()
+
+	def _remember(self, key, entry):
+
+		self.entries[key] = entry
+		self.entries.move_to_end(key)
+		while len(self.entries) > self.max_entries:
+			self.entries.popitem(last=False)
+
+	def _paths(self, key):
+
+		return (os.path.join(self.cache_dir, key + ".values.npy"),
+			os.path.join(self.cache_dir, key + ".vectors.npy"))
+
+	def _evict_files(self):
+
+		# Entries newest first, by the access time of their vectors file
+		entries = []
+		for name in os.listdir(self.cache_dir):
+			if name.endswith(".vectors.npy"):
+				paths = self._paths(name[:-len(".vectors.npy")])
+				stats = [os.stat(path) for path in paths if os.path.exists(path)]
+				entries.append((stats[-1].st_mtime, sum(stat.st_size for stat in stats), paths))
+
+		total = 0
+		for _, size, paths in sorted(entries, reverse=True):
+			total += size
+			if total > self.max_bytes:
+				for path in paths:
+					if os.path.exists(path):
+						os.remove(path)
+
+
+def randomized_eigenvectors(G, k, laplacian_type="symmetric", oversample=10, n_iter=4, degree=8, block_rows=65536, random_state=0, workdir=None):
+	"""
+	Approximates the k eigenvectors of the Laplacian with the smallest
+	eigenvalues by randomized subspace iteration with a Chebyshev filter,
+	without ever holding the Laplacian or the whole adjacency in memory.
+
+	Every iteration applies a Chebyshev polynomial of L that damps the
+	eigenvalues in [lower, upper] and amplifies those below lower. upper
+	is 2 for the symmetric Laplacian and 2 * max degree for the
+	unnormalized one, and lower is the largest Ritz value of the previous
+	iteration, so the filter adapts to the spectrum. A plain power
+	iteration on I - L / upper converges with the ratio of neighboring
+	eigenvalues, which is close to 1 for the unnormalized Laplacian of
+	graphs with a large max degree, so it would need far more passes.
+
+	Each product L @ X streams the adjacency in blocks of block_rows rows,
+	e.g. from arrays memory mapped by cdet.edgelist.open_graph. Blocks are
+	orthonormalized by shifted CholeskyQR3 from their l x l Gram matrix,
+	and a Rayleigh-Ritz step after every iteration gives the eigenpairs.
+
+	The accuracy of the defaults depends on the graph and the Laplacian,
+	through the gap between the k-th and (k+1)-th eigenvalue relative to
+	upper. On 20000 node planted partition graphs with 20 clear
+	communities the eigenvalues matched eigsh to about 1e-10 for the
+	symmetric Laplacian and 1e-8 for the unnormalized one, but with
+	weaker communities the largest of the k unnormalized eigenvalues
+	were off by up to 1e-2. Check the residuals L @ V - V * eig_values,
+	or raise n_iter, when the eigenvalues themselves matter.
+
+	Parameters
+	----------
+	G: nx.graph, scipy sparse matrix or (indptr, indices, weights)
+		See adjacency_matrix. Only the CSR arrays are read block by block
+	k: int
+		No. of eigenvectors
+	laplacian_type: str
+		"unnormalized" or "symmetric"
+	oversample: int
+		Extra columns of the subspace, l = k + oversample
+	n_iter: int
+		No. of filter iterations, each degree + 1 passes over the
+		adjacency
+	degree: int
+		Degree of the Chebyshev polynomial
+	block_rows: int
+		Rows of the adjacency read at a time
+	random_state: int
+		Seed for the starting subspace, the result is reproducible
+	workdir: str
+		If given, the n x l working arrays and the result are .npy files
+		memory mapped in this directory instead of arrays in memory
+
+	Returns
+	-------
+	eig_values: 1D np.array
+		Approximate eigenvalues in ascending order
+	eig_vectors: 2D np.array or np.memmap
+		Matching eigenvectors as columns
+	"""
+
+	if laplacian_type not in ("unnormalized", "symmetric"):
+		raise ValueError("Laplacian type can be 'unnormalized' or 'symmetric'.")
+
+	degrees = np.concatenate([np.asarray(block.sum(axis=1)).ravel() for _, _, block in _adjacency_blocks(G, block_rows)])
+	n = len(degrees)
+	l = min(n, k + oversample)
+
+	# Upper bound of the spectrum, by Gershgorin for the unnormalized Laplacian
+	if laplacian_type == "symmetric":
+		scale = np.zeros_like(degrees)
+		np.divide(1, np.sqrt(degrees), out=scale, where=degrees > 0)
+		upper = 2.0
 	else:
-		raise ValueError("Laplacian type can be 'normalized' or 'unnormalized'.")
+		scale = None
+		upper = 2 * degrees.max() if degrees.max() > 0 else 1.0
+
+	def array(name, columns):
+		if workdir is None:
+			return np.empty((n, columns))
+		os.makedirs(workdir, exist_ok=True)
+		return np.lib.format.open_memmap(os.path.join(workdir, name + ".npy"), mode="w+", dtype=np.float64, shape=(n, columns))
+
+	def apply(X, out, shift=0.0, factor=1.0, prev=None):
+		# out = factor * (L @ X - shift * X) - prev, one block of rows at a
+		# time. out may be prev, never X
+		X_scaled = X
+		if scale is not None:
+			X_scaled = X_buffer
+			for start in range(0, n, block_rows):
+				X_scaled[start:start + block_rows] = scale[start:start + block_rows, None] * X[start:start + block_rows]
+		for start, stop, block in _adjacency_blocks(G, block_rows):
+			WX = block @ X_scaled
+			if scale is None:
+				LX = degrees[start:stop, None] * X[start:stop] - WX
+			else:
+				LX = X[start:stop] - scale[start:stop, None] * WX
+			LX = factor * (LX - shift * X[start:stop])
+			if prev is not None:
+				LX -= prev[start:stop]
+			out[start:stop] = LX
+
+	def orthonormalize(Y, out):
+		# Shifted CholeskyQR3: Q = Y R^-1 from the Gram matrix, the shift
+		# keeps the first pass stable for the ill-conditioned filtered blocks
+		for source in (Y, out, out):
+			gram = sum(source[start:start + block_rows].T @ source[start:start + block_rows] for start in range(0, n, block_rows))
+			R = np.linalg.cholesky(gram + 1e-12 * np.trace(gram) * np.eye(l)).T
+			for start in range(0, n, block_rows):
+				out[start:start + block_rows] = np.linalg.solve(R.T, source[start:start + block_rows].T).T
+
+	def rayleigh_ritz(Q, LQ):
+		# Rotates Q in place to the Ritz vectors, returns the Ritz values
+		apply(Q, LQ)
+		B = sum(Q[start:start + block_rows].T @ LQ[start:start + block_rows] for start in range(0, n, block_rows))
+		theta, V = np.linalg.eigh((B + B.T) / 2)
+		for start in range(0, n, block_rows):
+			Q[start:start + block_rows] = Q[start:start + block_rows] @ V
+		return theta
+
+	rng = np.random.default_rng(random_state)
+	Y = array("randomized_Y", l)
+	Q = array("randomized_Q", l)
+	X_buffer = array("randomized_X", l) if scale is not None else None
+	for start in range(0, n, block_rows):
+		Y[start:start + block_rows] = rng.standard_normal((min(block_rows, n - start), l))
+	orthonormalize(Y, Q)
+	theta = rayleigh_ritz(Q, Y)
+
+	for _ in range(n_iter):
+		# Chebyshev polynomial of the given degree on [lower, upper], which
+		# is at most 1 there and grows fast below lower. lower is the
+		# largest Ritz value, so it falls towards the l-th eigenvalue
+		lower = min(theta[-1], 0.99 * upper)
+		center = (upper + lower) / 2
+		half_width = (upper - lower) / 2
+		previous, current = Q, Y
+		apply(previous, current, shift=center, factor=1 / half_width)
+		for _ in range(degree - 1):
+			apply(current, previous, shift=center, factor=2 / half_width, prev=previous)
+			previous, current = current, previous
+		orthonormalize(current, Q)
+		theta = rayleigh_ritz(Q, Y)
+
+	eig_vectors = array("randomized_U", k)
+	for start in range(0, n, block_rows):
+		eig_vectors[start:start + block_rows] = Q[start:start + block_rows, :k]
+
+	return theta[:k], eig_vectors
+
+
+def _adjacency_blocks(G, block_rows):
+	"""
+	Yields (start, stop, block), block being the adjacency rows start:stop
+	of G as a sp.csr_matrix. CSR arrays are sliced a block at a time, so
+	memory mapped arrays are only read one block at a time.
+	"""
+
+	if not isinstance(G, tuple):
+		W = adjacency_matrix(G)
+		for start in range(0, W.shape[0], block_rows):
+			stop = min(start + block_rows, W.shape[0])
+			yield start, stop, W[start:stop]
+		return
+
+	indptr, indices, weights = G
+	n = len(indptr) - 1
+	for start in range(0, n, block_rows):
+		stop = min(start + block_rows, n)
+		row_ptr = np.asarray(indptr[start:stop + 1], dtype=np.int64)
+		cols = np.asarray(indices[row_ptr[0]:row_ptr[-1]])
+		data = np.asarray(weights[row_ptr[0]:row_ptr[-1]], dtype=np.float64)
+		rows = np.repeat(np.arange(start, stop), np.diff(row_ptr))
+		# The diagonal holds twice the self-loop weight, see adjacency_matrix
+		data = np.where(rows == cols, 0.5, 1) * data
+		yield start, stop, sp.csr_matrix((data, cols, row_ptr - row_ptr[0]), shape=(stop - start, n))
+
+
+def spectral_embedding(G, k, laplacian_type="unnormalized", solver="eigsh", tol=None, maxiter=None, sigma=None, preconditioner=None, cache=None, **kwargs):
+	"""
+	Rows of the k eigenvectors of the Laplacian of G with the smallest
+	eigenvalues, one row per node.
+
+	Parameters
+	----------
+	G: nx.graph, scipy sparse matrix or (indptr, indices, weights)
+		See adjacency_matrix
+	k: int
+		No. of eigenvectors
+	laplacian_type: str
+		"unnormalized", "symmetric" or "random_walk". The random walk
+		Laplacian is not symmetric, so the symmetric one is solved and its
+		eigenvectors mapped back with D^{-1/2}. Eigenvectors of the
+		symmetric Laplacian are normalized
+	solver, tol, maxiter, sigma, preconditioner:
+		See smallest_eigenvectors. solver="randomized" uses
+		randomized_eigenvectors instead, which streams the adjacency and
+		never forms the Laplacian
+	cache: EmbeddingCache
+		Reuses the eigenvectors of an earlier solve of the same graph and
+		Laplacian with at least k vectors, by the same solver with the
+		same tol, maxiter, sigma, preconditioner, random_state and
+		randomized options. Solves with a LinearOperator preconditioner
+		are not cached
+	kwargs:
+		random_state, the seed of the LOBPCG starting block or of the
+		randomized solver. oversample, n_iter, degree, block_rows and
+		workdir for solver="randomized"
+
+	Returns
+	-------
+	U: 2D np.array
+		Embedding of shape (no. of nodes, k)
+	"""
+
+	solved_type = "symmetric" if laplacian_type == "random_walk" else laplacian_type
+	block_rows = kwargs.get("block_rows", 65536)
+	if solver != "randomized" or not isinstance(G, tuple):
+		G = adjacency_matrix(G)
+
+	options = {}
+	if solver == "randomized":
+		options = {name: kwargs[name] for name in ("oversample", "n_iter", "degree", "random_state") if name in kwargs}
+	elif solver == "eigsh":
+		options = {"sigma": sigma}
+	elif solver == "lobpcg":
+		options = {"preconditioner": preconditioner, "random_state": kwargs.get("random_state", 0)}
+		# A preconditioner object has no stable name to key on
+		if preconditioner is not None and not isinstance(preconditioner, str):
+			cache = None
+
+	eig = None
+	if cache is not None:
+		key = cache.key(G, solved_type, solver, tol=tol, maxiter=maxiter, **options)
+		eig = cache.get(key, k)
+
+	if eig is None:
+		if solver == "randomized":
+			eig = randomized_eigenvectors(G, k, laplacian_type=solved_type, block_rows=block_rows, workdir=kwargs.get("workdir"), **options)
+		else:
+			L = laplacian(G, laplacian_type=solved_type)
+			eig = smallest_eigenvectors(L, k, solver=solver, tol=tol, maxiter=maxiter, sigma=sigma, preconditioner=preconditioner,
+				random_state=kwargs.get("random_state", 0))
+		if cache is not None:
+			cache.put(key, *eig)
+	_, U = eig
+
+	degrees = None
+	if laplacian_type == "random_walk":
+		degrees = np.concatenate([np.asarray(block.sum(axis=1)).ravel() for _, _, block in _adjacency_blocks(G, block_rows)])
+
+	return _finish_embedding(U, laplacian_type, degrees)
+
+
+def _finish_embedding(U, laplacian_type, degrees=None):
+	"""
+	Maps eigenvectors of the solved Laplacian to the embedding of
+	laplacian_type, degrees being needed for "random_walk".
+	"""
+
+	if laplacian_type == "random_walk":
+		d_inv_root = np.zeros_like(degrees)
+		np.divide(1, np.sqrt(degrees), out=d_inv_root, where=degrees > 0)
+		U = d_inv_root[:, None] * U
+
+	# If L is symmetric, then normalize
+	if laplacian_type == "symmetric":
+		U = np.apply_along_axis(normalize_eigenvectors, 0, U)
+
+	return U
+
+
+def batch_spectral_embedding(graphs, k, laplacian_type="unnormalized"):
+	"""
+	spectral_embedding of many small graphs with a single batched dense
+	eigensolve. The Laplacians are padded to the size of the largest graph
+	and stacked, and np.linalg.eigh solves the whole stack in one call.
+	The padding rows only have a diagonal entry larger than any eigenvalue
+	of the graphs, so their eigenvectors sort after the k needed ones.
+
+	Parameters
+	----------
+	graphs: List of nx.graph, scipy sparse matrix or (indptr, indices, weights)
+		Graphs of at least k nodes each, see adjacency_matrix
+	k: int
+		No. of eigenvectors
+	laplacian_type: str
+		As in spectral_embedding
+
+	Returns
+	-------
+	embeddings: List[2D np.array]
+		Embedding of shape (no. of nodes, k) of every graph
+	"""
+
+	solved_type = "symmetric" if laplacian_type == "random_walk" else laplacian_type
+	adjacencies = [adjacency_matrix(G) for G in graphs]
+	sizes = [W.shape[0] for W in adjacencies]
+
+	stack = np.zeros((len(graphs), max(sizes, default=0), max(sizes, default=0)))
+	for L, W, size in zip(stack, adjacencies, sizes):
+		L[:size, :size] = laplacian(W, laplacian_type=solved_type).toarray()
+	# Gershgorin bound on the largest eigenvalue
+	pad = np.abs(stack).sum(axis=2).max(initial=0) + 1
+	for L, size in zip(stack, sizes):
+		L[np.arange(size, len(L)), np.arange(size, len(L))] = pad
+
+	_, eig_vectors = np.linalg.eigh(stack)
+
+	embeddings = []
+	for U, W, size in zip(eig_vectors, adjacencies, sizes):
+		degrees = np.asarray(W.sum(axis=1)).ravel() if laplacian_type == "random_walk" else None
+		embeddings.append(_finish_embedding(U[:size, :k], laplacian_type, degrees))
+	return embeddings
 
-	return L
 
 def generate_labels_dict(G, kmeans):
 	"""
@@ -72,10 +593,13 @@ def generate_labels_dict(G, kmeans):
 
 	Parameters
 	----------
-	G: nx.Graph
-		Graph with the nodes in question
-	kmeans: sklearn.cluster.KMeans
-		A KMeans object which has already been fit on the data
+	G: nx.Graph, scipy sparse matrix or (indptr, indices, weights)
+		Graph with the nodes in question. The nodes of an nx.Graph are
+		listed by their labels, in the order of adjacency_matrix, other
+		graphs by row index
+	kmeans: sklearn.cluster.KMeans or np.array
+		A KMeans object which has already been fit on the data,
+		or the cluster label of every node
 
 	Returns
 	-------
@@ -83,15 +607,121 @@ def generate_labels_dict(G, kmeans):
 		Mapping between cluster number and nodes
 	"""
 
-	num_nodes = len(G.nodes)
-	num_clusters = kmeans.n_clusters
+	return labels_partition(G, kmeans).to_dict()
+
+
+def labels_partition(G, kmeans):
+	"""
+	Same as generate_labels_dict, but returns a cdet.partition.Partition
+	holding the cluster of every node in one array.
+	"""
+
+	labels = getattr(kmeans, "labels_", kmeans)
+	num_clusters = getattr(kmeans, "n_clusters", None)
+	node_ids = list(G) if isinstance(G, nx.Graph) else None
+
+	return Partition(labels, node_ids=node_ids, num_communities=num_clusters)
+
+
+def minibatch_kmeans(U, k, batch_size=4096, n_init=3, max_epochs=3, n_threads=None, random_state=0):
+	"""
+	Mini-batch k-means that only ever reads U in chunks of batch_size
+	contiguous rows, so U can be a memory-mapped array (e.g. from
+	np.load(..., mmap_mode="r")) larger than memory.
+
+	Each restart seeds its centers with k-means++ on a random sample of
+	rows, then streams the chunks in shuffled order for max_epochs passes.
+	The restart with the lowest inertia, also computed chunk by chunk,
+	labels every row.
+
+	Parameters
+	----------
+	U: 2D np.array or np.memmap
+		Embedding with one row per node
+	k: int
+		No. of clusters
+	batch_size: int
+		Rows per chunk, at least k. The last chunk also takes the rows
+		left over
+	n_init: int
+		No. of restarts
+	max_epochs: int
+		Passes over U per restart
+	n_threads: int
+		Cap on the BLAS/OpenMP threads, None leaves it unchanged
+	random_state: int
+		Seed for the sampling, seeding and chunk order
+
+	Returns
+	-------
+	kmeans: sklearn.cluster.MiniBatchKMeans
+		Best model, with labels_ set for every row of U
+	"""
+
+	from sklearn.cluster import MiniBatchKMeans, kmeans_plusplus
+	from threadpoolctl import threadpool_limits
+
+	if batch_size < k:
+		raise ValueError("batch_size must be at least the no. of clusters k.")
+	if U.shape[0] < k:
+		raise ValueError("U has fewer rows than the no. of clusters k.")
+
+	rng = np.random.default_rng(random_state)
+	num_rows = U.shape[0]
+	# A short tail joins the chunk before it, so partial_fit never gets
+	# fewer than k rows
+	starts = np.arange(0, num_rows, batch_size)
+	if len(starts) > 1 and num_rows - starts[-1] < batch_size:
+		starts = starts[:-1]
+	chunks = [U[start:stop] for start, stop in zip(starts, np.append(starts[1:], num_rows))]
+	sample_size = min(num_rows, max(batch_size, 20 * k))
+
+	best_kmeans = None
+	best_inertia = np.inf
 
-	labels_dict = {c: [] for c in range(num_clusters)}
-	
-	for i in range(num_nodes):
-		labels_dict[kmeans.labels_[i]].append(i)
+	with threadpool_limits(n_threads):
+		for _ in range(n_init):
+			seed = int(rng.integers(2 ** 31 - 1))
+			sample = np.sort(rng.choice(num_rows, size=sample_size, replace=False))
+			centers, _ = kmeans_plusplus(np.asarray(U[sample]), k, random_state=seed)
 
-	return labels_dict
+			# Chunks of contiguous rows can all come from one cluster, so never
+			# reassign centers that a chunk happens not to hit
+			kmeans = MiniBatchKMeans(n_clusters=k, init=centers, n_init=1, batch_size=batch_size, reassignment_ratio=0, random_state=seed)
+			for _ in range(max_epochs):
+				for i in rng.permutation(len(chunks)):
+					kmeans.partial_fit(np.asarray(chunks[i]))
+
+			inertia = -sum(kmeans.score(np.asarray(chunk)) for chunk in chunks)
+			if inertia < best_inertia:
+				best_kmeans = kmeans
+				best_inertia = inertia
+
+		best_kmeans.labels_ = np.concatenate([best_kmeans.predict(np.asarray(chunk)) for chunk in chunks])
+
+	return best_kmeans
+
+
+def cluster_embedding(U, k, clustering="kmeans", n_init=None, n_threads=None, batch_size=4096):
+	"""
+	Clusters the rows of an embedding into k clusters, with the clustering,
+	n_init and n_threads options of spectral_clustering and batch_size for
+	"minibatch". Returns the fitted estimator, or the labels returned by a
+	callable clustering.
+	"""
+
+	if callable(clustering):
+		return clustering(U, k)
+	elif clustering == "kmeans":
+		from sklearn.cluster import KMeans
+		from threadpoolctl import threadpool_limits
+
+		with threadpool_limits(n_threads):
+			return KMeans(n_clusters=k, n_init="auto" if n_init is None else n_init, random_state=0).fit(U)
+	elif clustering == "minibatch":
+		return minibatch_kmeans(U, k, batch_size=batch_size, n_init=3 if n_init is None else n_init, n_threads=n_threads)
+	else:
+		raise ValueError("Clustering can be 'kmeans', 'minibatch' or a callable.")
 
 
 def visualize_graph(G, pos, labels_dict=None, colors=None, node_size=100, edge_alpha=0.1, labels=False):
@@ -132,14 +762,15 @@ def visualize_graph(G, pos, labels_dict=None, colors=None, node_size=100, edge_a
 	nx.draw_networkx_edges(G, pos, width=1.0, alpha=edge_alpha)
 
 
-def spectral_clustering(G, k, pos, colors, visualize=True, laplacian_type="unnormalized", **kwargs):
+def spectral_clustering(G, k, pos, colors, visualize=True, laplacian_type="unnormalized", solver="eigsh", tol=None, maxiter=None, clustering="kmeans", n_init=None, n_threads=None, cache=None, as_partition=False, **kwargs):
 	"""
 	Implements spectral clustering.
 
 	Parameters
 	----------
-	G: nx.graph
-		Graph on which to perform spectral clustering
+	G: nx.graph, scipy sparse matrix or (indptr, indices, weights)
+		Graph on which to perform spectral clustering, see adjacency_matrix.
+		Visualization needs an nx.graph
 	k: int
 		Initial estimate of the no. of clusters
 	pos: nx layout
@@ -150,36 +781,54 @@ def spectral_clustering(G, k, pos, colors, visualize=True, laplacian_type="unnor
 		True if we need to visualize else False
 	laplacian_type: str
 		"unnormalized", "symmetric" or "random_walk"
+	solver: str
+		Eigensolver, "eigsh", "lobpcg" (see smallest_eigenvectors) or
+		"randomized" (see randomized_eigenvectors), which with CSR arrays
+		from cdet.edgelist.open_graph and clustering="minibatch" never
+		holds the graph in memory
+	tol: float
+		Eigensolver tolerance, None uses the solver default
+	maxiter: int
+		Eigensolver iteration cap, None uses the solver default
+	clustering: str or callable
+		"kmeans", "minibatch" (see minibatch_kmeans) or a function
+		f(U, k) returning a fitted estimator or the label of every row
+	n_init: int
+		No. of k-means restarts, None uses the estimator default
+	n_threads: int
+		Cap on the threads used by the clustering stage
+	cache: EmbeddingCache
+		Cache of eigenvectors, so varying k or the clustering settings on
+		the same graph solves the eigenproblem once
+	as_partition: bool
+		Return a cdet.partition.Partition instead of a dict of node lists
 	kwargs:
+		batch_size: Rows per chunk for "minibatch"
+		oversample, n_iter, degree, block_rows, workdir: For solver="randomized"
+		sigma: Shift for eigsh shift-invert mode
+		preconditioner: Preconditioner for lobpcg, e.g. "amg"
+		random_state: Seed of the lobpcg starting block or of the randomized solver
 		node_size: Size of nodes in the plot
 		edge_alpha: Opacity of the edges
 		labels: True if to show labels in the plot
 
 	Returns
 	-------
-	labels_dict: Dict[int, List[int]]
+	labels_dict: Dict[int, List[int]] or Partition
 		Mapping between community number and nodes in
 		that community
 	"""
 
-	# Calculate Laplacian
-	L = laplacian(G, laplacian_type=laplacian_type)
-
-	# Get eigenvectors from the Laplacian
-	_, eig_vectors = sp.linalg.eigs(L, k)
-	
-	# Use eigenvectors as features
-	U = eig_vectors.real
-	
-	# If L is symmetric, then normalize
-	if laplacian_type == "symmetric":
-		U = np.apply_along_axis(normalize_eigenvectors, 0, U)
+	# Get the eigenvectors of the Laplacian with the smallest eigenvalues
+	U = spectral_embedding(G, k, laplacian_type=laplacian_type, solver=solver, tol=tol, maxiter=maxiter,
+		sigma=kwargs.get('sigma'), preconditioner=kwargs.get('preconditioner'), cache=cache,
+		**{name: kwargs[name] for name in ('oversample', 'n_iter', 'degree', 'block_rows', 'workdir', 'random_state') if name in kwargs})
 
-	# Cluster using KMeans
-	kmeans = KMeans(n_clusters=k, random_state=0).fit(U)
+	# Cluster the rows of U
+	kmeans = cluster_embedding(U, k, clustering=clustering, n_init=n_init, n_threads=n_threads, batch_size=kwargs.get('batch_size', 4096))
 
 	# Get labels
-	labels_dict = generate_labels_dict(G, kmeans)
+	partition = labels_partition(G, kmeans)
 
 	# Visualize
 	if visualize:
@@ -187,12 +836,13 @@ def spectral_clustering(G, k, pos, colors, visualize=True, laplacian_type="unnor
 		edge_alpha = kwargs.get('edge_alpha', 0.1)
 		labels = kwargs.get('labels', False)
 		
-		visualize_graph(G, pos, labels_dict, COLORS, node_size=node_size, edge_alpha=edge_alpha, labels=labels)
+		visualize_graph(G, pos, partition.to_dict(), colors, node_size=node_size, edge_alpha=edge_alpha, labels=labels)
 
-	return labels_dict
+	return partition if as_partition else partition.to_dict()
 
 
 def main():
+	import matplotlib.pyplot as plt
 
 	#### Experiments
 
@@ -212,9 +862,11 @@ def main():
 
 	# Visualize the graph
 	visualize_graph(G_kk, pos_kk)
+	plt.show()
 
 	# Visualize graph after spectral clustering
 	labels_dict = spectral_clustering(G_kk, 2, pos_kk, COLORS, laplacian_type="symmetric")
+	plt.show()
 
 
 	### Planted L-Partition Model
@@ -231,6 +883,7 @@ def main():
 
 	# Visualize original graph
 	visualize_graph(G_pl, pos_pl, edge_alpha=0.1, node_size=10, labels=False)
+	plt.show()
 
 	# Dictionary of labels
 	labels_dict = spectral_clustering(G_pl, 
@@ -241,7 +894,8 @@ def main():
 									  edge_alpha=0.1, 
 									  node_size=10, 
 									  labels=False)
+	plt.show()
 
 
 if __name__ == "__main__":
-	main()
\ No newline at end of file
+	main()
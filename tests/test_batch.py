@@ -0,0 +1,97 @@
+import os
+import time
+
+import networkx as nx
+import pytest
+
+from cdet import batch
+from cdet.batch import run_batch
+from cdet.louvains import csr_louvains_method
+
+
+def small_graphs(count=24):
+    graphs = []
+    for seed in range(count):
+        G = nx.planted_partition_graph(3, 8 + seed % 5, 0.7, 0.05, seed=seed)
+        graphs.append(nx.relabel_nodes(G, {node: "v{}".format(node) for node in G}))
+    return graphs
+
+
+def test_run_batch_checks_arguments_on_call():
+    with pytest.raises(ValueError):
+        run_batch([], method="walktrap")
+    with pytest.raises(ValueError):
+        run_batch([], method="spectral")
+    with pytest.raises(ValueError):
+        run_batch([], chunk_size=0)
+
+
+def test_run_batch_packed_louvain_matches_single_runs():
+    graphs = small_graphs()
+    records = list(run_batch(graphs, chunk_size=8))
+    assert [record["index"] for record in records] == list(range(len(graphs)))
+    for G, record in zip(graphs, records):
+        assert record["status"] == "ok"
+        csr, node_ids = batch._as_csr(G)
+        partition, modularity = csr_louvains_method(*csr, active_set=True)
+        assert record["modularity"] == pytest.approx(modularity)
+        assert record["partition"].to_list() == [[node_ids[node] for node in part] for part in partition]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_run_batch_pool_matches_serial(ordered):
+    graphs = small_graphs()
+    serial = list(run_batch(graphs, chunk_size=5))
+    parallel = list(run_batch(graphs, n_jobs=2, chunk_size=5, max_pending=1, ordered=ordered))
+    parallel.sort(key=lambda record: record["index"])
+    assert [(record["partition"].to_list(), record["modularity"]) for record in parallel] \
+        == [(record["partition"].to_list(), record["modularity"]) for record in serial]
+
+
+def test_run_batch_dead_worker_fails_its_chunk(monkeypatch):
+    run_chunk = batch._run_chunk
+
+    def crash_on_first_chunk(chunk, *config):
+        if chunk[0][0] == 0:
+            os._exit(1)
+        return run_chunk(chunk, *config)
+
+    # The forked workers see the patched function
+    monkeypatch.setattr(batch, "_run_chunk", crash_on_first_chunk)
+    monkeypatch.setattr(batch, "POLL_INTERVAL", 0.1)
+    records = list(run_batch(small_graphs(12), n_jobs=2, chunk_size=4))
+    assert [record["status"] for record in records] == ["failed"] * 4 + ["ok"] * 8
+    assert "died" in records[0]["error"]
+
+
+class SlowToUnpickle:
+    """
+    Takes a while to arrive in the parent, after the worker sent it.
+    """
+
+    def __reduce__(self):
+        return time.sleep, (1.0,)
+
+
+def test_run_batch_keeps_results_sent_before_a_worker_died(monkeypatch):
+    run_chunk = batch._run_chunk
+    sent = []
+
+    def crash_after_first_chunk(chunk, *config):
+        if sent:
+            os._exit(1)
+        records = run_chunk(chunk, *config)
+        if chunk[0][0] == 0:
+            sent.append(chunk)
+            records[0]["slow"] = SlowToUnpickle()
+        else:
+            time.sleep(0.2)
+        return records
+
+    monkeypatch.setattr(batch, "_run_chunk", crash_after_first_chunk)
+    monkeypatch.setattr(batch, "POLL_INTERVAL", 0.05)
+    records = list(run_batch(small_graphs(6), n_jobs=2, chunk_size=1))
+    statuses = [record["status"] for record in records]
+    # Only the chunk the worker died on fails
+    assert statuses[0] == "ok"
+    assert statuses.count("failed") == 1
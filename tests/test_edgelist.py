@@ -0,0 +1,142 @@
+import json
+import subprocess
+import sys
+
+import networkx as nx
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+
+from cdet.edgelist import csr_to_graph, open_graph, read_edgelist, save_graph
+from cdet.louvains import csr_louvains_method
+
+
+def dense(indptr, indices, weights):
+    return csr_matrix((weights, indices, indptr), shape=(len(indptr) - 1, len(indptr) - 1)).toarray()
+
+
+def expected_matrix(edges, node_ids):
+    """
+    Symmetric adjacency of the (u, v, w) edges in the order of node_ids,
+    with parallel edges adding up and self-loops counted twice.
+    """
+
+    index = {node: i for i, node in enumerate(node_ids.tolist())}
+    A = np.zeros((len(index), len(index)))
+    for u, v, w in edges:
+        A[index[u], index[v]] += w
+        A[index[v], index[u]] += w
+    return A
+
+
+@pytest.fixture
+def weighted_edges():
+    rng = np.random.default_rng(0)
+    edges = [(int(u), int(v), float(w)) for u, v, w in zip(rng.integers(1000, 1050, 300), rng.integers(1000, 1050, 300), rng.integers(1, 5, 300))]
+    # A repeated edge and a self-loop
+    return edges + [edges[0], (1003, 1003, 2.0)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_read_text_edgelist(tmp_path, chunk_size):
+    G = nx.karate_club_graph()
+    path = tmp_path / "edges.txt"
+    path.write_text("# karate club\n" + "".join("n{} n{}\n".format(u, v) for u, v in G.edges()) + "\n")
+
+    csr, node_ids = read_edgelist(str(path), chunk_size=chunk_size)
+    assert sorted(node_ids.tolist()) == sorted("n{}".format(node) for node in G)
+    assert np.array_equal(dense(*csr), expected_matrix([("n{}".format(u), "n{}".format(v), 1) for u, v in G.edges()], node_ids))
+
+    partition, modularity = csr_louvains_method(*csr)
+    assert modularity == pytest.approx(nx.community.modularity(G, [[int(node_ids[i][1:]) for i in part] for part in partition], weight=None))
+
+
+def test_read_weighted_formats(tmp_path, weighted_edges):
+    csv_path = tmp_path / "edges.csv"
+    csv_path.write_text("source,target,weight\n" + "".join("{},{},{}\n".format(*edge) for edge in weighted_edges))
+    npy_path = tmp_path / "edges.npy"
+    np.save(npy_path, np.array(weighted_edges, dtype=np.int64))
+    bin_path = tmp_path / "edges.bin"
+    np.array(weighted_edges, dtype=np.int32).tofile(bin_path)
+
+    results = [
+        read_edgelist(str(csv_path), nodetype=int, weighted=True, header=True, chunk_size=50),
+        read_edgelist(str(npy_path), weighted=True, chunk_size=50),
+        read_edgelist(str(bin_path), weighted=True, dtype=np.int32, chunk_size=50),
+    ]
+    for csr, node_ids in results:
+        assert csr[1].dtype == np.int64 and csr[2].dtype == np.float64
+        assert np.array_equal(dense(*csr), expected_matrix(weighted_edges, node_ids))
+
+
+def test_csr_to_graph_keeps_weights_and_self_loops(tmp_path, weighted_edges):
+    np.save(tmp_path / "edges.npy", np.array(weighted_edges))
+    csr, node_ids = read_edgelist(str(tmp_path / "edges.npy"), weighted=True)
+    G = csr_to_graph(*csr)
+    index = {node: i for i, node in enumerate(node_ids.tolist())}
+
+    assert G[index[1003]][index[1003]]["weight"] == 2.0 + sum(w for u, v, w in weighted_edges[:-1] if u == v == 1003)
+    assert G.size(weight="weight") == sum(w for _, _, w in weighted_edges)
+
+
+def test_read_edgelist_errors(tmp_path):
+    path = tmp_path / "edges.txt"
+    path.write_text("# nothing\n")
+    (indptr, indices, weights), node_ids = read_edgelist(str(path))
+    assert indptr.tolist() == [0] and len(indices) == len(weights) == len(node_ids) == 0
+
+    with pytest.raises(ValueError):
+        read_edgelist(str(path), fmt="parquet")
+    np.save(tmp_path / "edges.npy", np.zeros((4, 2)))
+    with pytest.raises(ValueError):
+        read_edgelist(str(tmp_path / "edges.npy"), weighted=True)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_and_open_graph(tmp_path, weighted_edges, mmap):
+    np.save(tmp_path / "edges.npy", np.array(weighted_edges))
+    csr, node_ids = read_edgelist(str(tmp_path / "edges.npy"), weighted=True)
+    save_graph(str(tmp_path / "store"), *csr, node_ids=node_ids)
+
+    stored, degrees, stored_ids = open_graph(str(tmp_path / "store"), mmap=mmap)
+    assert isinstance(stored[0], np.memmap) == mmap
+    assert stored[1].dtype == np.int32
+    for a, b in zip(stored, csr):
+        assert np.array_equal(a, b)
+    assert np.array_equal(stored_ids, node_ids)
+    assert np.allclose(degrees, dense(*csr).sum(axis=1))
+    assert csr_louvains_method(*stored, k_i=degrees) == csr_louvains_method(*csr)
+
+
+def test_save_graph_object_node_ids(tmp_path):
+    G = nx.Graph([((0, "a"), (1, "b")), ((1, "b"), (2, "c"))])
+    W = nx.to_scipy_sparse_array(G, format="csr")
+    node_ids = np.empty(3, dtype=object)
+    node_ids[:] = list(G)
+    save_graph(str(tmp_path), W.indptr, W.indices, W.data, node_ids=node_ids)
+    _, _, stored_ids = open_graph(str(tmp_path))
+    assert stored_ids.tolist() == [str(node) for node in G]
+
+
+def test_open_graph_checks_the_store(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        open_graph(str(tmp_path))
+
+    save_graph(str(tmp_path), np.array([0, 1, 2]), np.array([1, 0]), np.ones(2))
+    meta_path = tmp_path / "meta.json"
+    meta = json.loads(meta_path.read_text())
+    meta_path.write_text(json.dumps(dict(meta, num_entries=3)))
+    with pytest.raises(ValueError):
+        open_graph(str(tmp_path))
+    meta_path.write_text(json.dumps(dict(meta, version=meta["version"] + 1)))
+    with pytest.raises(ValueError):
+        open_graph(str(tmp_path))
+
+
+def test_edgelist_command(tmp_path):
+    path = tmp_path / "edges.tsv"
+    path.write_text("1\t2\n2\t3\n3\t1\n")
+    subprocess.run([sys.executable, "-m", "cdet.edgelist", str(path), str(tmp_path / "store"), "--nodetype", "int"], check=True, capture_output=True)
+    (indptr, indices, weights), degrees, node_ids = open_graph(str(tmp_path / "store"))
+    assert node_ids.tolist() == [1, 2, 3]
+    assert degrees.tolist() == [2, 2, 2]
@@ -0,0 +1,128 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from cdet import girvan_newman as gn
+
+
+def planted_partition(seed=0):
+    return nx.planted_partition_graph(3, 15, 0.6, 0.02, seed=seed)
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_girvan_newman_n_jobs_matches_serial(monkeypatch, incremental):
+    # Small enough that the partial updates also go through the pool
+    monkeypatch.setattr(gn, "MIN_PARALLEL_SOURCES", 2)
+    serial = gn.girvan_newman(planted_partition(), 3, incremental=incremental)
+    parallel = gn.girvan_newman(planted_partition(), 3, incremental=incremental, n_jobs=2)
+    assert sorted(map(sorted, parallel[0])) == sorted(map(sorted, serial[0]))
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_remove_edge_and_update_matches_recompute(monkeypatch, n_jobs):
+    monkeypatch.setattr(gn, "MIN_PARALLEL_SOURCES", 2)
+    G = planted_partition(seed=1)
+    betweenness = gn.edge_betweenness_centrality(G, normalized=False)
+    for _ in range(10):
+        edge = max(betweenness, key=betweenness.get)
+        gn.remove_edge_and_update(G, betweenness, edge, n_jobs=n_jobs)
+        expected = nx.edge_betweenness_centrality(G, normalized=False)
+        for (u, v), value in expected.items():
+            assert betweenness[(u, v) if (u, v) in betweenness else (v, u)] == pytest.approx(value)
+
+
+def weighted_graph(seed=0):
+    G = nx.gnm_random_graph(40, 100, seed=seed)
+    for u, v in G.edges():
+        G[u][v]["weight"] = 1 + (u + v) % 4
+    return G
+
+
+def assert_same_scores(betweenness, expected):
+    assert len(betweenness) == len(expected)
+    for (u, v), value in expected.items():
+        assert betweenness[(u, v) if (u, v) in betweenness else (v, u)] == pytest.approx(value)
+
+
+@pytest.mark.parametrize("normalized", [True, False])
+@pytest.mark.parametrize("weight", [None, "weight"])
+def test_pooled_edge_betweenness_matches_networkx(normalized, weight):
+    G = weighted_graph()
+    expected = nx.edge_betweenness_centrality(G, normalized=normalized, weight=weight)
+    assert_same_scores(gn.edge_betweenness_centrality(G, normalized=normalized, weight=weight, n_jobs=2), expected)
+
+
+@pytest.mark.parametrize("normalized", [True, False])
+@pytest.mark.parametrize("weight", [None, "weight"])
+def test_edge_betweenness_matches_networkx(normalized, weight):
+    G = weighted_graph()
+    expected = nx.edge_betweenness_centrality(G, normalized=normalized, weight=weight)
+    assert_same_scores(gn.edge_betweenness_centrality(G, normalized=normalized, weight=weight), expected)
+
+
+def test_unit_weights_match_bfs():
+    G = weighted_graph()
+    nx.set_edge_attributes(G, 1, "length")
+    assert_same_scores(gn.edge_betweenness_centrality(G, weight="length"), gn.edge_betweenness_centrality(G))
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_sampled_betweenness_with_every_pivot_is_exact(n_jobs):
+    G = weighted_graph(seed=1)
+    betweenness, error = gn.edge_betweenness_centrality(G, k=len(G), seed=0, n_jobs=n_jobs, return_error=True)
+    assert_same_scores(betweenness, nx.edge_betweenness_centrality(G))
+    assert max(error.values()) == pytest.approx(0)
+
+
+def test_sampled_betweenness_is_unbiased_with_calibrated_error():
+    G = nx.connected_watts_strogatz_graph(100, 6, 0.1, seed=0)
+    expected = nx.edge_betweenness_centrality(G)
+    edges = list(expected)
+    scores, errors = [], []
+    for seed in range(60):
+        betweenness, error = gn.edge_betweenness_centrality(G, k=25, seed=seed, return_error=True)
+        scores.append([betweenness[edge] for edge in edges])
+        errors.append([error[edge] for edge in edges])
+    scores, errors = np.array(scores), np.array(errors)
+    exact = np.array([expected[edge] for edge in edges])
+
+    assert np.median(np.abs(scores.mean(axis=0) - exact) / exact) < 0.1
+    # The contributions of single pivots are skewed, so compare variances
+    # rather than the coverage of error bars
+    ratio = np.median(scores.std(axis=0) / np.sqrt((errors ** 2).mean(axis=0)))
+    assert 0.8 < ratio < 1.2
+
+
+def test_serial_sampled_betweenness_does_not_keep_the_graph():
+    gn.edge_betweenness_centrality(weighted_graph(seed=1), k=10, seed=0)
+    assert not hasattr(gn, "_worker_graph")
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_split_component_matches_connected_components(seed):
+    G = nx.gnm_random_graph(30, 45, seed=seed)
+    G.add_edge(0, 0)
+    rng = np.random.default_rng(seed)
+    while G.number_of_edges():
+        edges = list(G.edges())
+        u, v = edges[rng.integers(len(edges))]
+        before = {frozenset(c) for c in nx.connected_components(G)}
+        G.remove_edge(u, v)
+        after = {frozenset(c) for c in nx.connected_components(G)}
+        piece = gn.split_component(G, u, v)
+        if len(after) == len(before):
+            assert piece is None
+        else:
+            component = next(c for c in before if u in c)
+            assert frozenset(piece) in after
+            assert len(piece) <= len(component) - len(piece)
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_girvan_newman_tracks_components(incremental):
+    # Two components to start with
+    G = nx.disjoint_union(planted_partition(seed=2), nx.path_graph(4))
+    communities, removed_edges = gn.girvan_newman(G.copy(), 5, incremental=incremental)
+    G.remove_edges_from(removed_edges)
+    assert communities == list(nx.connected_components(G))
+    assert len(communities) == 5
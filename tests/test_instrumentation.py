@@ -0,0 +1,64 @@
+import json
+
+import networkx as nx
+import pytest
+
+from cdet.girvan_newman import girvan_newman
+from cdet.instrumentation import Stats, phase
+from cdet.louvains import add_weight_to_edge, csr_louvains_method, edges_to_csr
+
+
+def karate_csr():
+    G = nx.karate_club_graph()
+    return edges_to_csr(list(G), add_weight_to_edge(G.edges()))
+
+
+def test_stats_records_counters_timers_and_traces():
+    seen = []
+    stats = Stats(callback=lambda name, value, stats: seen.append((name, value)))
+    stats.count("moves")
+    stats.count("moves", 4)
+    stats.trace("modularity", 0.25)
+    with phase(stats, "local_moving"):
+        pass
+    with phase(None, "local_moving"):
+        pass
+
+    assert stats.counters["moves"] == 5
+    assert seen == [("modularity", 0.25)]
+    assert set(stats.timers) == {"local_moving"}
+    assert json.loads(json.dumps(stats.as_dict()))["traces"] == {"modularity": [0.25]}
+
+
+@pytest.mark.parametrize("options", [{}, {"active_set": True}, {"n_jobs": 2}])
+def test_louvain_stats(options):
+    stats = Stats()
+    _, modularity = csr_louvains_method(*karate_csr(), stats=stats, **options)
+    _, expected = csr_louvains_method(*karate_csr(), **options)
+
+    assert modularity == expected
+    assert stats.counters["levels"] == len(stats.traces["nodes_per_level"]) == len(stats.traces["modularity"])
+    assert stats.traces["nodes_per_level"][0] == 34
+    assert stats.traces["modularity"][-1] == pytest.approx(modularity)
+    assert stats.counters["moves"] > 0
+    assert {"local_moving", "aggregation"} <= set(stats.timers)
+
+
+def test_stats_callback_can_abort_a_run():
+    def abort(name, value, stats):
+        if name == "modularity":
+            raise RuntimeError(value)
+
+    with pytest.raises(RuntimeError):
+        csr_louvains_method(*karate_csr(), stats=Stats(callback=abort))
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_girvan_newman_stats(incremental):
+    stats = Stats()
+    communities, removed_edges = girvan_newman(nx.karate_club_graph(), 3, incremental=incremental, stats=stats)
+
+    assert stats.counters["edges_removed"] == len(removed_edges)
+    assert stats.traces["components"][-1] == len(communities) == 3
+    assert {"betweenness", "components"} <= set(stats.timers)
+    assert (stats.counters["sources_recomputed"] > 0) == incremental
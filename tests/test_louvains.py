@@ -0,0 +1,268 @@
+import networkx as nx
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+
+from cdet import louvains
+from cdet.louvains import (add_weight_to_edge, calc_wts, csr_leiden_method, csr_louvains_method, edges_to_csr,
+    get_edges_of_node, louvains_method)
+from cdet.partition import Partition
+
+
+def gnm_component(n, m, seed):
+    """
+    Largest connected component of a G(n, m) graph, relabeled 0..n-1.
+    """
+
+    G = nx.gnm_random_graph(n, m, seed=seed)
+    return nx.convert_node_labels_to_integers(G.subgraph(max(nx.connected_components(G), key=len)))
+
+
+def to_csr(G):
+    return edges_to_csr(list(G), add_weight_to_edge(G.edges()))
+
+
+def run_louvains_method(G, **kwargs):
+    nodes = list(G)
+    edges = add_weight_to_edge(G.edges())
+    m, k_i = calc_wts(nodes, edges)
+    return louvains_method(nodes, edges, m, k_i, [0 for n in nodes], get_edges_of_node(edges), list(nodes), [], **kwargs)
+
+
+def assert_partition(partition, n):
+    assert sorted(node for part in partition for node in part) == list(range(n))
+
+
+# Small unweighted graphs on which local moving used to cycle a node
+# between tied communities forever
+TIED_GRAPHS = [(46, 67, 391), (46, 67, 35), (46, 67, 28), (46, 67, 275)]
+
+
+@pytest.mark.parametrize("n, m, graph_seed", TIED_GRAPHS)
+@pytest.mark.parametrize("seed", [None, 0, 28])
+def test_csr_louvain_terminates_on_ties(n, m, graph_seed, seed):
+    G = gnm_component(n, m, graph_seed)
+    partition, modularity = csr_louvains_method(*to_csr(G), seed=seed)
+    assert_partition(partition, len(G))
+    assert modularity == pytest.approx(nx.community.modularity(G, partition))
+
+
+@pytest.mark.parametrize("n, m, graph_seed", TIED_GRAPHS)
+@pytest.mark.parametrize("seed", [0, 28])
+def test_csr_leiden_terminates_on_ties(n, m, graph_seed, seed):
+    G = gnm_component(n, m, graph_seed)
+    partition, modularity = csr_leiden_method(*to_csr(G), seed=seed)
+    assert_partition(partition, len(G))
+    assert modularity == pytest.approx(nx.community.modularity(G, partition))
+
+
+@pytest.mark.parametrize("n, m, graph_seed", TIED_GRAPHS)
+@pytest.mark.parametrize("seed", [None, 0, 28])
+@pytest.mark.parametrize("active_set", [False, True])
+def test_louvains_method_terminates_on_ties(n, m, graph_seed, seed, active_set):
+    G = gnm_component(n, m, graph_seed)
+    partition, modularity = run_louvains_method(G, seed=seed, active_set=active_set)
+    assert_partition(partition, len(G))
+    assert modularity == pytest.approx(nx.community.modularity(G, partition))
+
+
+def test_resolution_sweep_cache(monkeypatch):
+    runs = []
+    run_csr_methods = louvains._run_csr_methods
+    monkeypatch.setattr(louvains, "_run_csr_methods", lambda *args: runs.append(len(args[6])) or run_csr_methods(*args))
+    monkeypatch.setattr(louvains, "RESOLUTION_CACHE_SIZE", 3)
+    monkeypatch.setattr(louvains, "_resolution_cache", louvains.OrderedDict())
+    csr = to_csr(gnm_component(60, 150, 0))
+
+    first = louvains.resolution_sweep(*csr, [0.5, 1, 2])
+    assert louvains.resolution_sweep(*csr, [0.5, 1, 2]) == first
+    # Other degrees are another key
+    louvains.resolution_sweep(*csr, [1], k_i=np.ones(len(csr[0]) - 1))
+    # 0.5 was the least recently used result
+    louvains.resolution_sweep(*csr, [0.5, 2])
+    assert runs == [3, 0, 1, 1]
+    assert len(louvains._resolution_cache) == 3
+
+
+def parity_graphs():
+    yield nx.karate_club_graph()
+    for seed in range(3):
+        yield nx.planted_partition_graph(4, 25, 0.4, 0.03, seed=seed)
+        yield gnm_component(80, 200, seed)
+        G = nx.gnm_random_graph(60, 180, seed=seed)
+        for u, v in G.edges():
+            G[u][v]["weight"] = 1 + (u * v + seed) % 3
+        yield G
+
+
+def weighted_edges(G):
+    return [((u, v), w) for u, v, w in G.edges(data="weight", default=1)]
+
+
+@pytest.mark.parametrize("G", list(parity_graphs()))
+def test_list_and_csr_louvain_parity(G):
+    G = nx.convert_node_labels_to_integers(G)
+    nodes = list(G)
+    edges = weighted_edges(G)
+    m, k_i = calc_wts(nodes, edges)
+    expected, expected_modularity = louvains_method(nodes, edges, m, k_i, [0 for n in nodes], get_edges_of_node(edges), list(nodes), [])
+    partition, modularity = csr_louvains_method(*edges_to_csr(nodes, edges))
+    assert sorted(map(sorted, partition)) == sorted(map(sorted, expected))
+    assert modularity == pytest.approx(expected_modularity)
+    assert modularity == pytest.approx(nx.community.modularity(G, partition))
+
+
+def planted_partition(seed, p_out):
+    return nx.convert_node_labels_to_integers(nx.planted_partition_graph(5, 30, 0.3, p_out, seed=seed))
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_parallel_louvain_modularity_on_clear_communities(seed):
+    csr = to_csr(planted_partition(seed, 0.02))
+    _, expected = csr_louvains_method(*csr)
+    _, modularity = csr_louvains_method(*csr, n_jobs=2)
+    assert modularity >= expected - 1e-9
+
+
+def test_parallel_louvain_modularity_on_mixed_communities():
+    # Moving a color class at once can end in a worse local optimum on a
+    # single graph, but not on average
+    expected, modularity = [], []
+    for seed in range(12):
+        csr = to_csr(planted_partition(seed, 0.08))
+        expected.append(csr_louvains_method(*csr)[1])
+        modularity.append(csr_louvains_method(*csr, n_jobs=2)[1])
+    assert np.mean(modularity) >= np.mean(expected) - 1e-3
+
+
+def test_parallel_modularity_optimisation_pool_matches_in_process():
+    indptr, indices, weights = to_csr(planted_partition(0, 0.05))
+    k_i = np.bincount(np.repeat(np.arange(len(indptr) - 1), np.diff(indptr)), weights=weights)
+    m = k_i.sum() / 2
+    expected = louvains.parallel_modularity_optimisation(indptr, indices, weights, k_i, m, np.arange(len(k_i)))
+    result = louvains.parallel_modularity_optimisation(indptr, indices, weights, k_i, m, np.arange(len(k_i)), n_jobs=2, min_batch=1)
+    for a, b in zip(result, expected):
+        assert np.allclose(a, b)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_leiden_modularity_on_clear_communities(seed):
+    csr = to_csr(planted_partition(seed, 0.02))
+    _, expected = csr_louvains_method(*csr)
+    _, modularity = csr_leiden_method(*csr)
+    assert modularity >= expected - 1e-9
+
+
+def test_leiden_modularity_on_mixed_communities():
+    expected, modularity = [], []
+    for seed in range(12):
+        csr = to_csr(planted_partition(seed, 0.08))
+        expected.append(csr_louvains_method(*csr)[1])
+        modularity.append(csr_leiden_method(*csr)[1])
+    assert np.mean(modularity) >= np.mean(expected)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_leiden_communities_are_connected(seed):
+    G = planted_partition(seed, 0.08)
+    partition, modularity = csr_leiden_method(*to_csr(G), seed=seed)
+    assert_partition(partition, len(G))
+    assert all(nx.is_connected(G.subgraph(part)) for part in partition)
+    assert modularity == pytest.approx(nx.community.modularity(G, partition))
+
+
+
+def test_serial_runs_do_not_share_the_graph(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(louvains, "_resolution_cache", louvains.OrderedDict())
+    graphs = [to_csr(gnm_component(60, 150, seed)) for seed in range(4)] * 3
+    expected = [louvains.multi_start_louvain(*csr, n_starts=4)[0] for csr in graphs]
+    assert not hasattr(louvains, "_run_csr")
+
+    with ThreadPoolExecutor(4) as executor:
+        assert list(executor.map(lambda csr: louvains.multi_start_louvain(*csr, n_starts=4)[0], graphs)) == expected
+        sweeps = list(executor.map(lambda csr: louvains.resolution_sweep(*csr, [1])[1], graphs))
+    assert sweeps == [csr_louvains_method(*csr, resolution=1.0) for csr in graphs]
+
+
+def test_in_process_moving_does_not_keep_the_graph():
+    csr = to_csr(planted_partition(0, 0.05))
+    csr_louvains_method(*csr, n_jobs=2)
+    assert not hasattr(louvains, "_worker_csr")
+
+
+def changed_graph(G, seed, n_changes=20):
+    """
+    G with n_changes random edges removed and as many absent ones added,
+    some on up to two new nodes.
+    """
+
+    rng = np.random.default_rng(seed)
+    edges = list(G.edges())
+    deletions = [edges[i] for i in rng.choice(len(edges), n_changes, replace=False)]
+    insertions = []
+    while len(insertions) < n_changes:
+        u, v = map(int, rng.choice(len(G) + 2, 2, replace=False))
+        if not G.has_edge(u, v) and (u, v) not in insertions and (v, u) not in insertions:
+            insertions.append((u, v))
+    H = G.copy()
+    H.remove_edges_from(deletions)
+    H.add_nodes_from(range(max(max(e) for e in insertions) + 1))
+    H.add_edges_from(insertions)
+    return H, insertions, deletions
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_louvains_update_matches_rerun(seed):
+    G = planted_partition(seed, 0.02)
+    H, insertions, deletions = changed_graph(G, seed)
+    csr = to_csr(G)
+    partition, _ = csr_louvains_method(*csr)
+
+    updated, (partition, modularity) = louvains.csr_louvains_update(*csr, partition, insertions=insertions, deletions=deletions)
+    assert_partition(partition, len(H))
+    assert modularity == pytest.approx(nx.community.modularity(H, partition))
+    assert modularity >= csr_louvains_method(*updated)[1] - 1e-9
+    expected = nx.to_scipy_sparse_array(H, nodelist=range(len(H)))
+    expected.setdiag(2 * expected.diagonal())
+    assert np.array_equal(csr_matrix((updated[2], updated[1], updated[0])).toarray(), expected.toarray())
+
+    # The updated graph and a Partition feed the next refresh
+    H.remove_edges_from(insertions)
+    _, (partition, modularity) = louvains.csr_louvains_update(*updated, Partition.from_communities(partition), deletions=insertions, as_partition=True)
+    assert isinstance(partition, Partition)
+    assert modularity == pytest.approx(nx.community.modularity(H, partition.to_list()))
+
+
+@pytest.mark.parametrize("method", ["louvain", "leiden"])
+def test_multi_start_louvain_keeps_the_best_start(method):
+    G = planted_partition(0, 0.08)
+    csr = to_csr(G)
+    (partition, modularity), consensus = louvains.multi_start_louvain(*csr, n_starts=6, seed=3, method=method)
+
+    run = csr_leiden_method if method == "leiden" else csr_louvains_method
+    assert consensus["modularity"] == [run(*csr, seed=seed)[1] for seed in consensus["seeds"]]
+    # Starts differ on mixed communities, so picking one matters
+    assert len(set(consensus["modularity"])) > 1
+    assert modularity == max(consensus["modularity"])
+    assert modularity == pytest.approx(nx.community.modularity(G, partition))
+    assert consensus["ari_to_best"][consensus["modularity"].index(modularity)] == pytest.approx(1)
+    assert consensus["edge_coassignment"].shape == csr[1].shape
+    assert ((0 <= consensus["edge_coassignment"]) & (consensus["edge_coassignment"] <= 1)).all()
+
+
+def test_multi_start_louvain_is_seeded():
+    csr = to_csr(planted_partition(1, 0.08))
+    serial = louvains.multi_start_louvain(*csr, n_starts=4, seed=7)
+    pooled = louvains.multi_start_louvain(*csr, n_starts=4, seed=7, n_jobs=2)
+    assert serial[0] == pooled[0]
+    assert serial[1]["seeds"] == pooled[1]["seeds"]
+    assert serial[1]["modularity"] == pooled[1]["modularity"]
+    assert louvains.multi_start_louvain(*csr, n_starts=4, seed=8)[1]["seeds"] != serial[1]["seeds"]
+
+    # A seeded order gives the same result on every call, in both local moving variants
+    for active_set in (False, True):
+        assert csr_louvains_method(*csr, seed=5, active_set=active_set) == csr_louvains_method(*csr, seed=5, active_set=active_set)
+    with pytest.raises(ValueError):
+        louvains.multi_start_louvain(*csr, method="infomap")
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from cdet.louvains import csr_louvains_method
+from cdet.partition import Partition
+from cdet.spectral_clustering import adjacency_matrix
+
+
+def test_partition_membership_and_conversions():
+    partition = Partition([2, 0, 2, 1, 0], num_communities=4)
+    assert partition.membership.dtype == np.int32
+    assert len(partition) == 4 and partition.num_nodes == 5
+    assert partition.sizes().tolist() == [2, 1, 2, 0]
+    assert partition.to_list() == [[1, 4], [3], [0, 2], []]
+    assert partition.to_dict() == {0: [1, 4], 1: [3], 2: [0, 2], 3: []}
+    assert [members.tolist() for members in partition] == partition.to_list()
+    assert not partition.members(0).flags.writeable
+
+    columns = partition.to_columns()
+    assert columns["node"].tolist() == [0, 1, 2, 3, 4]
+    assert columns["community"] is partition.membership
+
+
+def test_partition_from_communities_and_node_ids():
+    communities = [[3, 0], [1], [4, 2]]
+    partition = Partition.from_communities(communities)
+    assert partition.membership.tolist() == [0, 1, 2, 0, 2]
+    assert partition.to_list() == [[0, 3], [1], [2, 4]]
+
+    labeled = partition.with_node_ids(["a", "b", "c", "d", "e"])
+    assert np.shares_memory(labeled.membership, partition.membership)
+    assert labeled[0].tolist() == ["a", "d"]
+    assert labeled.to_list() == [["a", "d"], ["b"], ["c", "e"]]
+
+    # Tuple and mixed ids stay one id per node
+    assert Partition([0, 1], node_ids=[(0, 1), (1, 2)]).to_list() == [[(0, 1)], [(1, 2)]]
+    assert Partition([0, 0], node_ids=[1, "b"]).to_list() == [[1, "b"]]
+    with pytest.raises(ValueError):
+        Partition([0, 1], node_ids=["a"])
+
+
+def test_louvain_as_partition():
+    import networkx as nx
+
+    W = adjacency_matrix(nx.karate_club_graph())
+    csr = (W.indptr, W.indices, W.data)
+    partition, modularity = csr_louvains_method(*csr, as_partition=True)
+    assert isinstance(partition, Partition)
+    assert (partition.to_list(), modularity) == csr_louvains_method(*csr)
+
+
+def test_partition_to_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    partition = Partition([1, 0, 1], node_ids=["x", "y", "z"])
+    partition.to_parquet(str(tmp_path / "partition.parquet"))
+    assert pq.read_table(str(tmp_path / "partition.parquet")).to_pydict() == {"node": ["x", "y", "z"], "community": [1, 0, 1]}
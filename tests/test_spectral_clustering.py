@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+
+from cdet.spectral_clustering import (EmbeddingCache, adjacency_matrix, laplacian, minibatch_kmeans, randomized_eigenvectors,
+    smallest_eigenvectors, spectral_clustering, spectral_embedding)
+
+
+def blobs(num_rows, k, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = 10 * rng.standard_normal((k, 3))
+    labels = rng.integers(k, size=num_rows)
+    return centers[labels] + rng.standard_normal((num_rows, 3)), labels
+
+
+@pytest.mark.parametrize("random_state", range(7))
+def test_minibatch_kmeans_short_tail(random_state):
+    # 4097 rows leave a one row tail chunk
+    U, _ = blobs(4097, 5)
+    kmeans = minibatch_kmeans(U, 5, batch_size=4096, random_state=random_state)
+    assert kmeans.labels_.shape == (4097,)
+    assert set(kmeans.labels_) == set(range(5))
+
+
+@pytest.mark.parametrize("num_rows", [5, 9, 10, 11, 101])
+def test_minibatch_kmeans_batch_size_of_k(num_rows):
+    U, _ = blobs(num_rows, 5)
+    kmeans = minibatch_kmeans(U, 5, batch_size=5, random_state=1)
+    assert kmeans.labels_.shape == (num_rows,)
+
+
+def test_minibatch_kmeans_memmap(tmp_path):
+    U, _ = blobs(1000, 4)
+    np.save(tmp_path / "U.npy", U)
+    kmeans = minibatch_kmeans(np.load(tmp_path / "U.npy", mmap_mode="r"), 4, batch_size=300)
+    assert np.array_equal(kmeans.labels_, minibatch_kmeans(U, 4, batch_size=300).labels_)
+
+
+def test_minibatch_kmeans_rejects_small_batches():
+    U, _ = blobs(100, 5)
+    with pytest.raises(ValueError):
+        minibatch_kmeans(U, 5, batch_size=4)
+    with pytest.raises(ValueError):
+        minibatch_kmeans(U[:3], 5)
+
+
+def planted_partition(num_groups=10, group_size=200, p_in=0.1, p_out=0.005, seed=0):
+    import networkx as nx
+
+    return nx.planted_partition_graph(num_groups, group_size, p_in, p_out, seed=seed)
+
+
+@pytest.mark.parametrize("laplacian_type", ["unnormalized", "symmetric"])
+def test_randomized_eigenvectors_match_eigsh(laplacian_type):
+    W = adjacency_matrix(planted_partition())
+    L = laplacian(W, laplacian_type=laplacian_type)
+    expected, _ = smallest_eigenvectors(L, 10)
+    eig_values, eig_vectors = randomized_eigenvectors(W, 10, laplacian_type=laplacian_type)
+
+    assert np.allclose(np.sort(eig_values), np.sort(expected), rtol=1e-6, atol=1e-8 * expected.max())
+    residuals = np.linalg.norm(L @ eig_vectors - eig_vectors * eig_values, axis=0)
+    assert residuals.max() < 1e-3 * expected.max()
+
+
+@pytest.mark.parametrize("laplacian_type", ["unnormalized", "symmetric", "random_walk"])
+def test_randomized_spectral_clustering_recovers_planted_partition(laplacian_type):
+    from sklearn.metrics import adjusted_rand_score
+
+    G = planted_partition()
+    labels_dict = spectral_clustering(G, 10, None, None, visualize=False, laplacian_type=laplacian_type, solver="randomized")
+    labels = np.empty(len(G), dtype=np.int64)
+    for label, nodes in labels_dict.items():
+        labels[nodes] = label
+    assert adjusted_rand_score(np.repeat(np.arange(10), 200), labels) > 0.99
+
+
+def test_randomized_eigenvectors_csr_and_workdir(tmp_path):
+    W = adjacency_matrix(planted_partition())
+    csr = (W.indptr, W.indices, W.data)
+    eig_values, eig_vectors = randomized_eigenvectors(W, 10, block_rows=300)
+    csr_values, csr_vectors = randomized_eigenvectors(csr, 10, block_rows=300, workdir=str(tmp_path))
+    assert np.allclose(eig_values, csr_values)
+    assert np.allclose(eig_vectors, csr_vectors)
+
+
+def test_embedding_cache_keys_by_solver_and_tolerance():
+    W = adjacency_matrix(planted_partition())
+    cache = EmbeddingCache()
+    spectral_embedding(W, 10, solver="randomized", n_iter=1, cache=cache)
+    spectral_embedding(W, 10, tol=1e-2, cache=cache)
+    assert cache.hits == 0
+
+    exact = spectral_embedding(W, 10, cache=cache)
+    assert cache.hits == 0
+    assert np.array_equal(spectral_embedding(W, 8, cache=cache), exact[:, :8])
+    assert cache.hits == 1
+
+
+def test_embedding_cache_on_disk(tmp_path):
+    W = adjacency_matrix(planted_partition())
+    U = spectral_embedding(W, 10, laplacian_type="symmetric", cache=EmbeddingCache(cache_dir=str(tmp_path)))
+    cache = EmbeddingCache(cache_dir=str(tmp_path))
+    assert np.allclose(spectral_embedding(W, 10, laplacian_type="symmetric", cache=cache), U)
+    assert cache.hits == 1
+
+
+@pytest.mark.parametrize("laplacian_type", ["unnormalized", "symmetric"])
+@pytest.mark.parametrize("options", [{"sigma": -1e-3}, {"solver": "lobpcg", "tol": 1e-6, "maxiter": 500},
+    {"solver": "lobpcg", "preconditioner": "amg", "tol": 1e-6, "maxiter": 200}])
+def test_smallest_eigenvectors_solvers_match_eigsh(laplacian_type, options):
+    if options.get("preconditioner") == "amg":
+        pytest.importorskip("pyamg")
+    L = laplacian(adjacency_matrix(planted_partition(num_groups=5, group_size=100)), laplacian_type=laplacian_type)
+    expected, _ = smallest_eigenvectors(L, 5)
+    eig_values, eig_vectors = smallest_eigenvectors(L, 5, **options)
+
+    assert np.allclose(eig_values, expected, atol=1e-6 * expected.max())
+    residuals = np.linalg.norm(L @ eig_vectors - eig_vectors * eig_values, axis=0)
+    assert residuals.max() < 1e-4 * expected.max()
+
+
+def test_smallest_eigenvectors_rejects_unknown_solver():
+    L = laplacian(adjacency_matrix(planted_partition(num_groups=2, group_size=20)))
+    with pytest.raises(ValueError):
+        smallest_eigenvectors(L, 2, solver="arpack")
+
+
+def test_embedding_cache_keys_by_solver_options():
+    from scipy.sparse.linalg import LinearOperator
+
+    pytest.importorskip("pyamg")
+    W = adjacency_matrix(planted_partition(num_groups=5, group_size=100))
+    cache = EmbeddingCache()
+    spectral_embedding(W, 5, cache=cache)
+    spectral_embedding(W, 5, sigma=-1e-3, cache=cache)
+    spectral_embedding(W, 5, solver="lobpcg", tol=1e-6, cache=cache)
+    spectral_embedding(W, 5, solver="lobpcg", tol=1e-6, random_state=1, cache=cache)
+    spectral_embedding(W, 5, solver="lobpcg", tol=1e-6, preconditioner="amg", cache=cache)
+    assert cache.hits == 0 and len(cache.entries) == 5
+
+    U = spectral_embedding(W, 5, solver="lobpcg", tol=1e-6, random_state=1, cache=cache)
+    assert cache.hits == 1
+    assert np.array_equal(U, spectral_embedding(W, 5, solver="lobpcg", tol=1e-6, random_state=1))
+
+    identity = LinearOperator(W.shape, matvec=lambda x: x, dtype=np.float64)
+    spectral_embedding(W, 5, solver="lobpcg", tol=1e-6, preconditioner=identity, cache=cache)
+    assert cache.hits + cache.misses == 6 and len(cache.entries) == 5